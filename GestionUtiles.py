@@ -1,5 +1,93 @@
+import csv
+import gc
+import heapq
+import math
+import os
+import re
+import threading
 import tkinter as tk
-from tkinter import messagebox, font, ttk   # Importamos herramientas para crear ventanas, cuadros de diálogo y estilos.
+import unicodedata
+from tkinter import messagebox, font, ttk, filedialog   # Importamos herramientas para crear ventanas, cuadros de diálogo y estilos.
+from bisect import bisect_left, insort      # Para mantener ordenados los índices sin reordenar todo
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from kardex import Kardex
+from operator import attrgetter
+
+# Cómo se compara cada producto según el criterio de orden (los textos sin importar mayúsculas)
+CLAVES_ORDEN = {
+    "nombre": lambda nodo: nodo.nombre.lower(),
+    "precio": lambda nodo: nodo.precio,
+    "categoria": lambda nodo: nodo.categoria.lower(),
+    "stock": lambda nodo: nodo.stock,
+}
+
+# Campos de texto en los que se puede buscar, ya pasados a minúsculas
+CAMPOS_TEXTO = {
+    "codigo": lambda nodo: str(nodo.codigo).lower(),
+    "nombre": lambda nodo: nodo.nombre.lower(),
+    "categoria": lambda nodo: nodo.categoria.lower(),
+}
+
+# Todos los campos de un producto que pueden cambiar los índices
+CAMPOS = ("codigo", "nombre", "categoria", "precio", "stock")
+
+# Campos de los que dependen los totales por categoría
+CAMPOS_RESUMEN = {"categoria", "precio", "stock"}
+
+def trigramas(texto):
+    # Devuelve los trozos de 3 letras seguidas de un texto ("lapiz" -> "lap", "api", "piz")
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+# Máximo de errores de escritura que tolera la búsqueda de nombres parecidos
+DISTANCIA_MAXIMA = 2
+
+def normalizar(texto):
+    # Minúsculas y sin tildes ("Bolígrafo" -> "boligrafo"), para comparar como se escriba
+    descompuesto = unicodedata.normalize("NFD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def palabras_de(texto):
+    # Palabras normalizadas de un texto ("Lápiz HB-2" -> "lapiz", "hb", "2")
+    return set(re.findall(r"\w+", normalizar(texto)))
+
+def variantes_borrando(palabra, borrar=1):
+    # La palabra y lo que queda al quitarle hasta `borrar` letras ("lapiz" -> "apiz", "lpiz", ...).
+    # Dos palabras a `borrar` errores o menos siempre comparten alguna de estas variantes.
+    resultado = ultimas = {palabra}
+    for _ in range(borrar):
+        ultimas = {p[:i] + p[i + 1:] for p in ultimas for i in range(len(p))}
+        resultado = resultado | ultimas
+    return resultado
+
+def variantes_a_un_error(palabra, letras):
+    # Todo lo que está a un error de la palabra: una letra borrada, cambiada o agregada
+    # (de las `letras` dadas) o dos vecinas intercambiadas
+    cortes = [(palabra[:i], palabra[i:]) for i in range(len(palabra) + 1)]
+    resultado = {a + b[1:] for a, b in cortes if b}
+    resultado |= {a + b[1] + b[0] + b[2:] for a, b in cortes if len(b) > 1}
+    resultado |= {a + c + b[1:] for a, b in cortes if b for c in letras}
+    resultado |= {a + c + b for a, b in cortes for c in letras}
+    return resultado
+
+def distancia_edicion(a, b, tope):
+    # Letras cambiadas, agregadas, quitadas o intercambiadas con la vecina para pasar de a a b.
+    # Deja de calcular apenas se pasa de `tope`, y entonces devuelve tope + 1.
+    if abs(len(a) - len(b)) > tope:
+        return tope + 1
+    antepenultima, anterior = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], antepenultima[j - 2] + 1)   # Letras intercambiadas
+        if min(actual) > tope:
+            return tope + 1
+        antepenultima, anterior = anterior, actual
+    return min(anterior[-1], tope + 1)
 
 # ------------------- CLASE NODO -------------------
 class Nodo:
@@ -11,12 +99,106 @@ class Nodo:
         self.precio = precio        # Precio del producto
         self.stock = stock          # Cantidad disponible en inventario
         self.siguiente = None       # Apunta al siguiente producto en la lista (o nada si es el último)
+        self.anterior = None        # Apunta al producto anterior (o nada si es el primero)
+        self.orden = 0              # Número de llegada a la lista (desempata los índices de orden)
+
+# ------------------- VISTAS DE SOLO LECTURA -------------------
+class VistaSoloLectura:
+    # Base de las vistas de un producto que devuelven los motores (VistaProducto aquí,
+    # FilaProducto en catalogo_columnar, RegistroMapeado en catalogo_mmap). Cada una define
+    # una propiedad por campo de CAMPOS; con eso se lee como objeto (vista.nombre) o como
+    # diccionario (vista["nombre"]), sin copiar los datos y sin permitir cambiarlos.
+    __slots__ = ()
+
+    def __getitem__(self, campo):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def a_dict(self):
+        # Copia los datos en un diccionario (por si se necesitan guardar tal como están ahora)
+        return {campo: getattr(self, campo) for campo in CAMPOS}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.a_dict()!r})"
+
+
+class VistaProducto(VistaSoloLectura):
+    # Vista de un Nodo de la lista
+    __slots__ = ("_nodo",)
+
+    def __init__(self, nodo):
+        self._nodo = nodo
+
+    codigo = property(lambda self: self._nodo.codigo)
+    nombre = property(lambda self: self._nodo.nombre)
+    categoria = property(lambda self: self._nodo.categoria)
+    precio = property(lambda self: self._nodo.precio)
+    stock = property(lambda self: self._nodo.stock)
+
+
+# ------------------- CONSULTAS SIN ÍNDICES DE ORDEN -------------------
+# Para los motores que no mantienen índices de orden (ListaColumnar, CatalogoMapeado):
+# reciben los productos en el orden de la lista y la clave de orden de cada uno.
+def rango_recorriendo(productos, clave, es_texto, minimo, maximo):
+    """Los productos con la clave entre minimo y maximo (None = sin límite), de menor a mayor."""
+    if es_texto:   # Los textos se comparan en minúsculas
+        minimo = None if minimo is None else minimo.lower()
+        maximo = None if maximo is None else maximo.lower()
+    return sorted((p for p in productos
+                   if (minimo is None or clave(p) >= minimo) and (maximo is None or clave(p) <= maximo)),
+                  key=clave)
+
+
+def top_k_recorriendo(productos, clave, k, ascendente):
+    """Los k primeros según la clave (None = los primeros de la lista), sin ordenar todo."""
+    # Montículo de tamaño k sobre (posición en la lista, producto); la posición desempata
+    productos = enumerate(productos)
+    if clave is None:
+        return [p for _, p in islice(productos, max(k, 0))]
+    elegir = heapq.nsmallest if ascendente else heapq.nlargest
+    return [p for _, p in elegir(k, productos, key=lambda pp: (clave(pp[1]), pp[0]))]
 
 # ------------------- CLASE LISTA ENLAZADA -------------------
 class ListaEnlazada:
     # Esta clase administra la lista de productos como una cadena enlazada
     def __init__(self):
         self.cabeza = None  # Aquí se guarda el primer producto de la lista (si hay alguno)
+        self.cola = None    # Aquí se guarda el último producto, para añadir al final sin recorrer
+        self._indice = {}   # Diccionario código -> nodo, para encontrar un producto al instante
+        self._llegadas = 0  # Contador para numerar los productos según van llegando
+        # Índices de orden: por cada criterio, una lista ordenada de (clave, orden de llegada, nodo).
+        # El orden de llegada nunca se repite, así que nunca se llega a comparar dos nodos.
+        self._ordenados = {criterio: [] for criterio in CLAVES_ORDEN}
+        # Índices de orden que están por armarse: una carga sobre un índice vacío no ordena
+        # nada; el índice se arma desde la cadena la primera vez que alguien lo lee
+        self._sin_ordenar = set()
+        # Índice de búsqueda: por cada campo de texto, trigrama -> productos que lo contienen
+        self._trigramas = {campo: {} for campo in CAMPOS_TEXTO}
+        # Índice de nombres parecidos: palabra normalizada -> productos con esa palabra en el
+        # nombre, y variante con una letra borrada -> palabras que la producen. Es el índice
+        # más caro y solo lo usa parecidos(), así que se arma la primera vez que se llama
+        # (None = sin armar); los números no entran
+        self._palabras = None
+        self._variantes = None
+        self._letras = set()   # Letras que aparecen en las palabras del índice
+        # Los índices de texto son lo más caro de una carga: insertar_lote deja sus productos
+        # aquí (código -> nodo) y se indexan recién cuando se busca texto por primera vez
+        self._sin_texto = {}
+        self._candado_indices = threading.Lock()   # Para que dos hilos no armen lo mismo a la vez
+        # Alertas de reposición: umbrales por código y por categoría (en minúsculas), y la cola
+        # de productos que llegaron a su umbral (código -> nodo, en el orden en que llegaron)
+        self._umbrales_producto = {}
+        self._umbrales_categoria = {}
+        self._alertas = {}
+        # Totales por categoría (en minúsculas), al día con cada cambio
+        self._resumen = {}
+        # Registro de movimientos de stock (por ejemplo kardex.Kardex); None para no registrar
+        self.kardex = None
+
+    def __len__(self):
+        # Cantidad de productos en la lista
+        return len(self._indice)
 
     # ---------- FUNCIONES PARA AGREGAR, BUSCAR, MODIFICAR Y ELIMINAR PRODUCTOS ----------
     def insertar_producto(self, codigo, nombre, categoria, precio, stock):
@@ -24,33 +206,107 @@ class ListaEnlazada:
         Agrega un nuevo producto al final de la lista.
         Si ya existe un producto con ese código, no lo agrega.
         """
-        if self.buscar_nodo(codigo):  # Busca si ya existe un producto con ese código
+        if codigo in self._indice:   # Busca si ya existe un producto con ese código
             return False             # Si existe, no se puede agregar (evitar duplicados)
 
         nuevo = Nodo(codigo, nombre, categoria, precio, stock)  # Crea un nuevo producto
         if self.cabeza is None:
             self.cabeza = nuevo     # Si la lista está vacía, el nuevo producto será el primero
         else:
-            actual = self.cabeza
-            while actual.siguiente:  # Busca el último producto en la lista
-                actual = actual.siguiente
-            actual.siguiente = nuevo # Añade el nuevo producto al final
+            nuevo.anterior = self.cola   # El nuevo producto queda detrás del último
+            self.cola.siguiente = nuevo  # Añade el nuevo producto al final
+        self.cola = nuevo
+        self._indice[codigo] = nuevo     # Lo registra en el índice por código
+        self._llegadas += 1
+        nuevo.orden = self._llegadas
+        self._indexar(nuevo)             # Y en los índices de orden y de búsqueda
+        self._revisar_alerta(nuevo)
+        self._registrar_movimiento(nuevo, stock)   # El stock inicial es el primer movimiento
         return True
 
+    def insertar_lote(self, filas):
+        """
+        Agrega muchos productos de una sola vez (por ejemplo, al cargar el catálogo).
+        Recibe filas (codigo, nombre, categoria, precio, stock) y las enlaza al final
+        en el mismo orden. Devuelve una lista con las filas rechazadas, como tuplas
+        (posición de la fila, código, motivo); si la lista está vacía, entraron todas.
+        Los índices de texto de estas filas se arman en la primera búsqueda de texto.
+        """
+        gc_activo = gc.isenabled()
+        gc.disable()   # Durante la carga solo se crean objetos: no vale la pena buscar basura
+        try:
+            return self._insertar_lote(filas)
+        finally:
+            if gc_activo:
+                gc.enable()
+
+    def _insertar_lote(self, filas):
+        rechazadas = []
+        primero = ultimo = None   # Trozo de cadena nuevo que se enlazará al final
+        nuevos = {}               # Códigos de este lote, para detectar repetidos dentro del lote
+        for i, fila in enumerate(filas):
+            if len(fila) != 5:
+                rechazadas.append((i, None, "Fila incompleta"))
+                continue
+            codigo, nombre, categoria, precio, stock = fila
+            if codigo in self._indice or codigo in nuevos:
+                rechazadas.append((i, codigo, "Código duplicado"))
+                continue
+            nuevo = Nodo(codigo, nombre, categoria, precio, stock)
+            if ultimo is None:
+                primero = nuevo
+            else:
+                nuevo.anterior = ultimo
+                ultimo.siguiente = nuevo
+            ultimo = nuevo
+            self._llegadas += 1
+            nuevo.orden = self._llegadas
+            nuevos[codigo] = nuevo
+
+        if primero is not None:   # Une el trozo nuevo a la lista de una sola vez
+            if self.cabeza is None:
+                self.cabeza = primero
+            else:
+                primero.anterior = self.cola
+                self.cola.siguiente = primero
+            self.cola = ultimo
+            self._indice.update(nuevos)
+            # Añade todo el lote a cada índice de orden y lo reordena una sola vez.
+            # Si el índice estaba vacío (al cargar el catálogo) se deja para cuando se lea.
+            for criterio, clave in CLAVES_ORDEN.items():
+                entradas = self._ordenados[criterio]
+                if not entradas or criterio in self._sin_ordenar:
+                    self._sin_ordenar.add(criterio)
+                    continue
+                entradas.extend((clave(n), n.orden, n) for n in nuevos.values())
+                entradas.sort()
+            self._sin_texto.update(nuevos)   # Su texto se indexa con la primera búsqueda
+            if self._palabras is not None:   # El índice de parecidos, si ya existe, se mantiene
+                self._indexar_palabras_lote(nuevos.values(), self._palabras)
+            for nodo in nuevos.values():
+                self._sumar_categoria(nodo, 1)
+            if self.kardex is not None:
+                for nodo in nuevos.values():
+                    self._registrar_movimiento(nodo, nodo.stock)
+            if self._umbrales_producto or self._umbrales_categoria:
+                for nodo in nuevos.values():
+                    self._revisar_alerta(nodo)
+        return rechazadas
+
     def buscar_nodo(self, codigo):
         # Busca un producto por su código, regresando el producto si lo encuentra, sino None
-        actual = self.cabeza
-        while actual:
-            if actual.codigo == codigo:
-                return actual
-            actual = actual.siguiente
-        return None
+        return self._indice.get(codigo)
 
     def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
         # Modifica la información de un producto si existe, cambiando solo los campos que se envían
         nodo = self.buscar_nodo(codigo)
         if not nodo:
             return False
+        # Solo se reacomodan los índices de los campos que cambian
+        campos = [c for c, v in (("nombre", nombre), ("categoria", categoria),
+                                 ("precio", precio), ("stock", stock)) if v is not None]
+        self._desindexar(nodo, campos)
+        stock_anterior = nodo.stock
         if nombre is not None:
             nodo.nombre = nombre
         if categoria is not None:
@@ -59,20 +315,32 @@ class ListaEnlazada:
             nodo.precio = precio
         if stock is not None:
             nodo.stock = stock
+        self._indexar(nodo, campos)
+        if stock is not None or categoria is not None:
+            self._revisar_alerta(nodo)
+        if nodo.stock != stock_anterior:
+            self._registrar_movimiento(nodo, nodo.stock - stock_anterior)
         return True
 
     def eliminar_producto(self, codigo):
         # Elimina un producto de la lista por su código
-        actual, anterior = self.cabeza, None
-        while actual:
-            if actual.codigo == codigo:
-                if anterior:
-                    anterior.siguiente = actual.siguiente  # Salta el producto que se elimina
-                else:
-                    self.cabeza = actual.siguiente  # Si es el primero, cambia la cabeza de la lista
-                return True
-            anterior, actual = actual, actual.siguiente
-        return False
+        nodo = self._indice.pop(codigo, None)
+        if not nodo:
+            return False
+        self._desindexar(nodo)
+        self._sin_texto.pop(codigo, None)
+        self._alertas.pop(codigo, None)
+        if nodo.stock:
+            self._registrar_movimiento(nodo, -nodo.stock, saldo=0)   # Lo que había sale del inventario
+        if nodo.anterior:
+            nodo.anterior.siguiente = nodo.siguiente  # Salta el producto que se elimina
+        else:
+            self.cabeza = nodo.siguiente  # Si es el primero, cambia la cabeza de la lista
+        if nodo.siguiente:
+            nodo.siguiente.anterior = nodo.anterior
+        else:
+            self.cola = nodo.anterior     # Si es el último, cambia la cola de la lista
+        return True
 
     # ---------- FUNCIONES PARA MANEJAR EL INVENTARIO (SUMAR O RESTAR STOCK) ----------
     def ajustar_stock(self, codigo, cantidad):
@@ -86,130 +354,1124 @@ class ListaEnlazada:
             return False
         if nodo.stock + cantidad < 0:
             return False
-        nodo.stock += cantidad
+        self._aplicar_stock(nodo, cantidad)
         return True
 
+    def ajustar_stock_lote(self, movimientos):
+        """
+        Aplica varios cambios de stock (por ejemplo, todas las líneas de un pedido) como uno solo:
+        se aplican todos o ninguno. Recibe pares (codigo, cantidad) y se revisan en orden, como
+        si se llamara a ajustar_stock línea por línea. Devuelve las líneas que fallan como
+        tuplas (posición de la línea, código, motivo); si la lista está vacía, se aplicó todo.
+        """
+        fallas = []
+        nodos, totales = {}, {}   # Por código: su nodo y la suma de sus cantidades
+        for i, (codigo, cantidad) in enumerate(movimientos):
+            nodo = nodos.get(codigo) or self.buscar_nodo(codigo)   # Una búsqueda por código
+            if not nodo:
+                fallas.append((i, codigo, "Producto no encontrado"))
+                continue
+            nodos[codigo] = nodo
+            total = totales.get(codigo, 0) + cantidad
+            if nodo.stock + total < 0:
+                fallas.append((i, codigo, "Stock insuficiente"))
+                continue
+            totales[codigo] = total
+        if fallas:
+            return fallas   # No se cambió nada
+        for codigo, total in totales.items():
+            if total:
+                self._aplicar_stock(nodos[codigo], total)   # Un solo reacomodo por producto
+        return fallas
+
+    def _aplicar_stock(self, nodo, cantidad):
+        # Suma la cantidad (ya validada) y reacomoda el índice de stock
+        self._desindexar(nodo, ("stock",))
+        nodo.stock += cantidad
+        self._indexar(nodo, ("stock",))
+        self._revisar_alerta(nodo)
+        self._registrar_movimiento(nodo, cantidad)
+
+    def conectar_kardex(self, kardex):
+        """
+        Empieza a anotar cada movimiento de stock en `kardex` (por ejemplo kardex.Kardex());
+        None lo desconecta. Es un método y no solo el atributo para que también llegue a la
+        lista a través de los envoltorios (InventarioPersistente, HistorialCambios).
+        """
+        self.kardex = kardex
+
+    def _registrar_movimiento(self, nodo, cantidad, saldo=None):
+        # Anota el cambio de stock en el kardex, si hay uno conectado
+        if self.kardex is not None:
+            self.kardex.registrar(nodo.codigo, cantidad, nodo.stock if saldo is None else saldo,
+                                  nodo.categoria)
+
+    # ---------- ALERTAS DE REPOSICIÓN (STOCK BAJO) ----------
+    def definir_umbral_producto(self, codigo, umbral):
+        """
+        Avisa cuando el stock del producto quede en `umbral` o menos (None quita el umbral).
+        El umbral de un producto tiene prioridad sobre el de su categoría.
+        """
+        if umbral is None:
+            self._umbrales_producto.pop(codigo, None)
+        else:
+            self._umbrales_producto[codigo] = umbral
+        nodo = self._indice.get(codigo)
+        if nodo:
+            self._revisar_alerta(nodo)
+
+    def definir_umbral_categoria(self, categoria, umbral):
+        """Umbral para todos los productos de una categoría (sin importar mayúsculas)."""
+        buscada = categoria.lower()
+        if umbral is None:
+            self._umbrales_categoria.pop(buscada, None)
+        else:
+            self._umbrales_categoria[buscada] = umbral
+        # Solo al cambiar el umbral se revisan los productos de la categoría (en el orden de la lista)
+        if len(buscada) >= 3:
+            candidatos = sorted(self._candidatos("categoria", buscada), key=lambda n: n.orden)
+        else:
+            candidatos = self._nodos()
+        for nodo in candidatos:
+            if nodo.categoria.lower() == buscada:
+                self._revisar_alerta(nodo)
+
+    def _revisar_alerta(self, nodo):
+        # Se llama con cada cambio de stock y es O(1): el producto entra a la cola al llegar
+        # a su umbral o bajar de él, y sale cuando se repone por encima
+        umbral = self._umbrales_producto.get(nodo.codigo)
+        if umbral is None and self._umbrales_categoria:
+            umbral = self._umbrales_categoria.get(nodo.categoria.lower())
+        if umbral is not None and nodo.stock <= umbral:
+            if nodo.codigo not in self._alertas:
+                self._alertas[nodo.codigo] = nodo
+        else:
+            self._alertas.pop(nodo.codigo, None)
+
+    # ---------- RESUMEN POR CATEGORÍA ----------
+    def resumen_categorias(self):
+        """
+        Por cada categoría: cantidad de productos, unidades en stock y valor del inventario
+        (precio x stock). Los totales se llevan al día con cada cambio, así que no se
+        recorre la lista: cuesta lo mismo con cien productos que con un millón.
+        """
+        return [dict(r, valor=round(r["valor"], 2))
+                for _, r in sorted(self._resumen.items())]
+
+    def cantidad_alertas(self):
+        return len(self._alertas)
+
+    def alertas(self, limite=None):
+        # Productos que hay que reponer, del que entró primero a la cola al último
+        return [self._a_dict(nodo) for nodo in islice(self._alertas.values(), limite)]
+
+    # ---------- ÍNDICES DE ORDEN Y DE BÚSQUEDA (SE ACTUALIZAN CON CADA CAMBIO) ----------
+    def _indexar(self, nodo, campos=None):
+        # Coloca el producto en los índices de los campos indicados (todos si no se indica)
+        campos = CAMPOS if campos is None else campos
+        for criterio in campos:
+            if criterio in self._ordenados and criterio not in self._sin_ordenar:
+                insort(self._ordenados[criterio], (CLAVES_ORDEN[criterio](nodo), nodo.orden, nodo))
+        self._indexar_texto(nodo, campos)
+        if "nombre" in campos and self._palabras is not None:
+            self._indexar_palabras(nodo.nombre, (nodo,), self._palabras)
+        if not CAMPOS_RESUMEN.isdisjoint(campos):
+            self._sumar_categoria(nodo, 1)
+
+    def _desindexar(self, nodo, campos=None):
+        # Quita el producto de los índices; debe llamarse antes de cambiar sus datos
+        campos = CAMPOS if campos is None else campos
+        for criterio in campos:
+            if criterio in self._ordenados and criterio not in self._sin_ordenar:
+                entradas = self._ordenados[criterio]
+                i = bisect_left(entradas, (CLAVES_ORDEN[criterio](nodo), nodo.orden))
+                if i == len(entradas) or entradas[i][2] is not nodo:
+                    # Solo pasa si una clave no se puede comparar (un precio NaN): borrar lo
+                    # que haya en esa posición dejaría a otro producto fuera del índice
+                    raise RuntimeError(f"El índice de {criterio} no tiene al producto "
+                                       f"{nodo.codigo!r} donde corresponde")
+                del entradas[i]
+        if not CAMPOS_RESUMEN.isdisjoint(campos):
+            self._sumar_categoria(nodo, -1)   # Se vuelve a sumar con los datos nuevos
+        if "nombre" in campos and self._palabras is not None:
+            self._desindexar_palabras(nodo)
+        if nodo.codigo in self._sin_texto:
+            return   # Su texto todavía no estaba indexado
+        for campo in campos:
+            if campo in self._trigramas:
+                indice = self._trigramas[campo]
+                for t in trigramas(CAMPOS_TEXTO[campo](nodo)):
+                    productos = indice[t]
+                    productos.discard(nodo)
+                    if not productos:
+                        del indice[t]   # No se guardan trigramas que ya nadie usa
+
+    def _sumar_categoria(self, nodo, signo):
+        # Suma (signo 1) o resta (signo -1) el producto en los totales de su categoría: O(1)
+        clave = nodo.categoria.lower()
+        resumen = self._resumen.get(clave)
+        if resumen is None:
+            resumen = self._resumen[clave] = {"categoria": nodo.categoria, "productos": 0,
+                                              "unidades": 0, "valor": 0.0}
+        resumen["productos"] += signo
+        resumen["unidades"] += signo * nodo.stock
+        resumen["valor"] += signo * nodo.precio * nodo.stock
+        if resumen["productos"] == 0:
+            del self._resumen[clave]   # Categoría vacía (y sin restos de redondeo)
+
+    def _indexar_texto(self, nodo, campos):
+        # Registra los trigramas de los campos de texto indicados
+        if nodo.codigo in self._sin_texto:
+            return   # Se indexará con sus datos de ese momento, cuando se busque texto
+        for campo in campos:
+            if campo in self._trigramas:
+                indice = self._trigramas[campo]
+                for t in trigramas(CAMPOS_TEXTO[campo](nodo)):
+                    indice.setdefault(t, set()).add(nodo)
+
+    def _indexar_texto_lote(self, nodos):
+        # Como _indexar_texto, pero agrupa los productos que tienen el mismo texto
+        # para calcular sus trigramas una sola vez y añadirlos todos juntos
+        for campo, texto_de in CAMPOS_TEXTO.items():
+            grupos = {}
+            for nodo in nodos:
+                grupos.setdefault(texto_de(nodo), []).append(nodo)
+            indice = self._trigramas[campo]
+            for texto, grupo in grupos.items():
+                for t in trigramas(texto):
+                    indice.setdefault(t, set()).update(grupo)
+
+    def _palabras_al_dia(self):
+        # Arma el índice de nombres parecidos la primera vez que se usa. Se llena aparte y
+        # se publica al final, para que nadie vea un índice a medias
+        if self._palabras is None:
+            with self._candado_indices:
+                if self._palabras is None:
+                    self._variantes = {}
+                    palabras = {}
+                    self._indexar_palabras_lote(self._nodos(), palabras)
+                    self._palabras = palabras
+
+    def _indexar_palabras_lote(self, nodos, palabras):
+        # Agrupa los productos con el mismo nombre para separar sus palabras una sola vez
+        grupos = {}
+        for nodo in nodos:
+            grupos.setdefault(nodo.nombre, []).append(nodo)
+        for nombre, grupo in grupos.items():
+            self._indexar_palabras(nombre, grupo, palabras)
+
+    def _indexar_palabras(self, nombre, nodos, palabras):
+        # Registra las palabras del nombre; las variantes se calculan solo para palabras nuevas
+        for palabra in palabras_de(nombre):
+            if palabra.isdigit():   # Los números no se buscan con errores
+                continue
+            productos = palabras.get(palabra)
+            if productos is None:
+                productos = palabras[palabra] = set()
+                self._letras.update(palabra)
+                for variante in variantes_borrando(palabra):
+                    self._variantes.setdefault(variante, set()).add(palabra)
+            productos.update(nodos)
+
+    def _desindexar_palabras(self, nodo):
+        for palabra in palabras_de(nodo.nombre):
+            if palabra.isdigit():
+                continue
+            productos = self._palabras[palabra]
+            productos.discard(nodo)
+            if not productos:   # Ningún nombre usa ya esta palabra
+                del self._palabras[palabra]
+                for variante in variantes_borrando(palabra):
+                    palabras = self._variantes[variante]
+                    palabras.discard(palabra)
+                    if not palabras:
+                        del self._variantes[variante]
+
+    def _indice_orden(self, criterio):
+        # El índice de orden del criterio, armándolo antes si una carga lo dejó pendiente
+        if criterio in self._sin_ordenar:
+            with self._candado_indices:
+                if criterio in self._sin_ordenar:
+                    clave = CLAVES_ORDEN[criterio]
+                    entradas = [(clave(n), n.orden, n) for n in self._nodos()]
+                    entradas.sort()
+                    self._ordenados[criterio] = entradas
+                    self._sin_ordenar.discard(criterio)
+        return self._ordenados[criterio]
+
+    def _texto_al_dia(self):
+        # Indexa el texto de lo que cargó insertar_lote; lo hace la primera búsqueda de texto.
+        # Con el candado, si dos hilos buscan a la vez, el segundo espera en lugar de repetirlo.
+        if self._sin_texto:
+            with self._candado_indices:
+                if self._sin_texto:
+                    self._indexar_texto_lote(self._sin_texto.values())
+                    self._sin_texto = {}
+
+    def preparar_indices(self, progreso=None):
+        """
+        Arma ya los índices que una carga dejó pendientes (los de orden y el de texto),
+        para que la primera consulta no tenga que esperarlos. Está pensado para correr en
+        segundo plano después de recuperar o importar: con `progreso` avisa un paso por
+        índice y se puede cancelar entre uno y otro (lo que falte se arma al leerlo).
+        """
+        pendientes = sorted(self._sin_ordenar)
+        total = len(pendientes) + 1
+        for i, criterio in enumerate(pendientes):
+            if progreso is not None:
+                progreso.avisar(i, total)
+            self._indice_orden(criterio)
+        if progreso is not None:
+            progreso.avisar(total - 1, total)
+        self._texto_al_dia()
+
+    def _candidatos(self, campo, texto):
+        # Productos cuyo campo tiene todos los trigramas del texto (luego hay que confirmarlos)
+        self._texto_al_dia()
+        grupos = []
+        for t in trigramas(texto):
+            productos = self._trigramas[campo].get(t)
+            if not productos:
+                return set()
+            grupos.append(productos)
+        grupos.sort(key=len)   # Se empieza por el grupo más pequeño
+        return grupos[0].intersection(*grupos[1:])
+
     # ---------- FUNCIONES PARA CONVERTIR LA LISTA EN FORMATO USABLE POR LA INTERFAZ ----------
     def _to_list(self):
         # Convierte toda la lista enlazada a una lista normal de diccionarios con datos de productos
-        productos, actual = [], self.cabeza
+        return [self._a_dict(nodo) for nodo in self._nodos()]
+
+    def _nodos(self):
+        # Recorre los nodos de la lista, del primero al último
+        actual = self.cabeza
         while actual:
-            productos.append({
-                "codigo": actual.codigo,
-                "nombre": actual.nombre,
-                "categoria": actual.categoria,
-                "precio": actual.precio,
-                "stock": actual.stock
-            })
+            yield actual
             actual = actual.siguiente
-        return productos
+
+    @staticmethod
+    def _a_dict(nodo):
+        # Copia los datos de un producto en un diccionario
+        return {
+            "codigo": nodo.codigo,
+            "nombre": nodo.nombre,
+            "categoria": nodo.categoria,
+            "precio": nodo.precio,
+            "stock": nodo.stock
+        }
+
+    # ---------- RECORRER PRODUCTOS SIN COPIARLOS (VISTAS DE SOLO LECTURA) ----------
+    def recorrer(self):
+        # Entrega uno a uno los productos de la lista como VistaProducto
+        for nodo in self._nodos():
+            yield VistaProducto(nodo)
+
+    def recorrer_ordenado(self, criterio):
+        # Igual que recorrer(), pero en el orden del criterio indicado
+        for nodo in self._nodos_ordenados(criterio):
+            yield VistaProducto(nodo)
+
+    def recorrer_filtrado(self, nombre_substr="", categoria="", codigo_substr="", progreso=None):
+        # Igual que recorrer(), pero solo con los productos que pasan el filtro.
+        # Con `progreso` avisa cuántos productos lleva revisados (ver avisando())
+        for nodo in self._nodos_filtrados(nombre_substr, categoria, codigo_substr, progreso):
+            yield VistaProducto(nodo)
 
     # ---------- ORDENAR PRODUCTOS SEGÚN DISTINTO CRITERIO ----------
     def ordenar(self, criterio):
         # Devuelve una lista ordenada según nombre, precio, categoría o stock
-        productos = self._to_list()
-        if criterio == "nombre":
-            productos.sort(key=lambda x: x["nombre"].lower())  # Orden alfabético del nombre
-        elif criterio == "precio":
-            productos.sort(key=lambda x: x["precio"])         # Orden numérico del precio
-        elif criterio == "categoria":
-            productos.sort(key=lambda x: x["categoria"].lower())  # Orden alfabético de categoría
-        elif criterio == "stock":
-            productos.sort(key=lambda x: x["stock"])          # Orden numérico del stock
-        return productos
-
-    # ---------- FILTRAR PRODUCTOS POR NOMBRE Y/O CATEGORÍA ----------
-    def filtrar(self, nombre_substr="", categoria=""):
-        # Devuelve productos cuyo nombre y categoría contienen los textos buscados (no importa mayúsculas)
-        nombre_substr, categoria = nombre_substr.lower(), categoria.lower()
-        return [
-            p for p in self._to_list()
-            if (nombre_substr in p["nombre"].lower())
-            and (categoria in p["categoria"].lower())
-        ]
+        return [self._a_dict(nodo) for nodo in self._nodos_ordenados(criterio)]
+
+    def _nodos_ordenados(self, criterio):
+        # No reordena nada: recorre el índice del criterio, que ya está en orden
+        if criterio not in self._ordenados:
+            return self._nodos()   # Criterio desconocido: se devuelve en el orden de la lista
+        return (nodo for _, _, nodo in self._indice_orden(criterio))
+
+    # ---------- RANGOS DE VALORES (PRECIO ENTRE 2 Y 5, STOCK ENTRE 0 Y 10...) ----------
+    def rango(self, campo, minimo=None, maximo=None):
+        """
+        Devuelve los productos con el campo entre minimo y maximo (ambos incluidos; None es
+        sin límite), de menor a mayor. Busca los extremos en el índice de orden del campo
+        por bisección, así que cuesta O(log n + k) con k productos en el rango.
+        """
+        return [self._a_dict(nodo) for nodo in self._nodos_rango(campo, minimo, maximo)]
+
+    def recorrer_rango(self, campo, minimo=None, maximo=None, progreso=None):
+        # Igual que rango(), pero con vistas de solo lectura (y `progreso` como en recorrer_filtrado)
+        nodos = self._nodos_rango(campo, minimo, maximo)
+        for nodo in nodos if progreso is None else avisando(nodos, progreso):
+            yield VistaProducto(nodo)
+
+    def _nodos_rango(self, campo, minimo, maximo):
+        entradas = self._indice_orden(campo)   # KeyError si el campo no tiene índice de orden
+        if campo in CAMPOS_TEXTO:           # Los textos se comparan en minúsculas
+            minimo = None if minimo is None else minimo.lower()
+            maximo = None if maximo is None else maximo.lower()
+        # (valor,) va antes que cualquier (valor, orden, nodo); (valor, inf), después
+        desde = 0 if minimo is None else bisect_left(entradas, (minimo,))
+        hasta = len(entradas) if maximo is None else bisect_left(entradas, (maximo, math.inf))
+        return [nodo for _, _, nodo in entradas[desde:hasta]]
+
+    # ---------- LOS PRIMEROS K PRODUCTOS SEGÚN UN CRITERIO ----------
+    def top_k(self, criterio, k, ascendente=True, categoria=None):
+        """
+        Devuelve los k primeros productos según el criterio, por ejemplo los 20 con menos
+        stock o (con ascendente=False) los 50 más caros, opcionalmente de una sola categoría.
+        Da lo mismo que ordenar (o su reverso) cortado en k, sin ordenar todo.
+        """
+        return [self._a_dict(nodo) for nodo in self._nodos_top_k(criterio, k, ascendente, categoria)]
+
+    def _nodos_top_k(self, criterio, k, ascendente, categoria):
+        if categoria is None:
+            if criterio not in self._ordenados:   # Criterio desconocido: los primeros de la lista
+                return list(islice(self._nodos(), max(k, 0)))
+            # Sin categoría basta con leer una punta del índice de orden
+            entradas = self._indice_orden(criterio)
+            elegidas = entradas[:max(k, 0)] if ascendente else entradas[:-max(k, 0) - 1:-1]
+            return [nodo for _, _, nodo in elegidas]
+        # Con categoría: montículo de tamaño k sobre los productos de esa categoría
+        buscada = categoria.lower()
+        candidatos = self._candidatos("categoria", buscada) if len(buscada) >= 3 else self._nodos()
+        en_categoria = (n for n in candidatos if n.categoria.lower() == buscada)
+        if criterio not in CLAVES_ORDEN:
+            return heapq.nsmallest(k, en_categoria, key=lambda n: n.orden)
+        clave = CLAVES_ORDEN[criterio]
+        elegir = heapq.nsmallest if ascendente else heapq.nlargest
+        return elegir(k, en_categoria, key=lambda n: (clave(n), n.orden))
+
+    # ---------- NOMBRES PARECIDOS (TOLERA ERRORES DE ESCRITURA) ----------
+    def parecidos(self, texto, distancia=None, limite=50):
+        """
+        Busca productos cuyo nombre se parece al texto aunque esté mal escrito ("cuardeno"
+        encuentra "Cuaderno", "boligrafo" encuentra "Bolígrafo"). Cada palabra buscada tiene
+        que parecerse a una palabra del nombre con a lo más `distancia` errores (por defecto
+        0 en palabras de 1 o 2 letras, 1 hasta 5 letras y 2 en las más largas; nunca más de
+        DISTANCIA_MAXIMA). Devuelve hasta `limite` productos (None = todos), de más a menos
+        parecidos, cada uno con su "distancia" (la suma de los errores de sus palabras).
+        """
+        return [dict(self._a_dict(nodo), distancia=d)
+                for d, nodo in self._nodos_parecidos(texto, distancia, limite)]
+
+    def _nodos_parecidos(self, texto, distancia, limite):
+        # Todo se hace con conjuntos: errores -> productos con esa cantidad de errores
+        self._palabras_al_dia()
+        por_palabra = []
+        numeros = set()
+        for buscada in palabras_de(texto):
+            if buscada.isdigit():   # Los números no están en el índice: se piden exactos
+                numeros.add(buscada)
+                continue
+            if distancia is None:
+                tope = 0 if len(buscada) <= 2 else 1 if len(buscada) <= 5 else 2
+            else:
+                tope = min(max(distancia, 0), DISTANCIA_MAXIMA)
+            grupos = {}
+            for d, palabra in self._palabras_parecidas(buscada, tope):
+                grupos.setdefault(d, set()).update(self._palabras[palabra])
+            if not grupos:
+                return []
+            vistos = set()
+            for d in sorted(grupos):   # Cada producto se queda con sus menos errores
+                grupos[d] -= vistos
+                vistos |= grupos[d]
+            por_palabra.append(grupos)
+        if not por_palabra:
+            return []
+        # Solo quedan los productos que tienen todas las palabras, con la suma de sus errores
+        por_distancia = por_palabra[0]
+        for grupos in por_palabra[1:]:
+            combinados = {}
+            for d1, productos in por_distancia.items():
+                for d2, otros in grupos.items():
+                    comunes = productos & otros
+                    if comunes:
+                        combinados.setdefault(d1 + d2, set()).update(comunes)
+            por_distancia = combinados
+        if numeros:
+            por_distancia = {d: {n for n in productos if numeros <= palabras_de(n.nombre)}
+                             for d, productos in por_distancia.items()}
+        # Primero los de menos errores y, con los mismos errores, en el orden de la lista
+        elegidos = []
+        for d in sorted(por_distancia):
+            grupo = sorted(por_distancia[d], key=attrgetter("orden"))
+            if limite is not None:
+                grupo = grupo[:limite - len(elegidos)]
+            elegidos.extend((d, nodo) for nodo in grupo)
+            if limite is not None and len(elegidos) >= limite:
+                break
+        return elegidos
+
+    def _palabras_parecidas(self, buscada, tope):
+        # Palabras del índice a `tope` errores o menos, como pares (errores, palabra).
+        # El índice solo guarda variantes con una letra borrada, que alcanzan para hallar
+        # las palabras a un error; para más, se buscan las que están a un error de todo lo
+        # que queda a tope - 1 errores de la buscada. distancia_edicion confirma cada una.
+        origenes = {buscada}
+        for _ in range(tope - 1):
+            origenes |= {v for o in origenes for v in variantes_a_un_error(o, self._letras)}
+        candidatas = set()
+        for origen in origenes:
+            for variante in variantes_borrando(origen):
+                candidatas.update(self._variantes.get(variante, ()))
+        parecidas = []
+        for palabra in candidatas:
+            d = distancia_edicion(buscada, palabra, tope)
+            if d <= tope:
+                parecidas.append((d, palabra))
+        return parecidas
+
+    # ---------- FILTRAR PRODUCTOS POR NOMBRE, CATEGORÍA Y/O CÓDIGO ----------
+    def filtrar(self, nombre_substr="", categoria="", codigo_substr=""):
+        # Devuelve productos cuyo nombre, categoría y código contienen los textos buscados
+        # (no importa mayúsculas)
+        return [self._a_dict(n) for n in self._nodos_filtrados(nombre_substr, categoria, codigo_substr)]
+
+    def _nodos_filtrados(self, nombre_substr, categoria, codigo_substr, progreso=None):
+        # Los textos de 3 o más letras se buscan en el índice de trigramas
+        # y solo se revisan los productos que salen de ahí
+        buscados = {"nombre": nombre_substr.lower(), "categoria": categoria.lower(),
+                    "codigo": codigo_substr.lower()}
+        buscados = {campo: texto for campo, texto in buscados.items() if texto}  # Vacío = sin filtro
+        candidatos = None
+        for campo, texto in buscados.items():
+            if len(texto) >= 3:
+                grupo = self._candidatos(campo, texto)
+                candidatos = grupo if candidatos is None else candidatos & grupo
+
+        if candidatos is None:   # Solo hay textos cortos: se revisa toda la lista
+            nodos = self._nodos()
+        else:                    # Se devuelven en el mismo orden que tienen en la lista
+            nodos = sorted(candidatos, key=lambda n: n.orden)
+        if progreso is not None:
+            nodos = avisando(nodos, progreso)
+        return (
+            n for n in nodos
+            if all(texto in CAMPOS_TEXTO[campo](n) for campo, texto in buscados.items())
+        )
+
+# ------------------- HISTORIAL PARA DESHACER Y REHACER -------------------
+class HistorialCambios:
+    """
+    Envuelve una lista de productos y anota, por cada cambio, la operación que lo deshace
+    (por ejemplo, eliminar un producto se deshace insertándolo con los datos que tenía).
+
+    Deshacer o rehacer un paso cuesta lo mismo que el cambio original, sin copiar el
+    catálogo. Se guardan los últimos `limite` pasos. Un producto eliminado que se recupera
+    vuelve al final de la lista. insertar_lote (importar) no se puede deshacer y borra
+    el historial. Todo lo que no sea un cambio pasa directo a la lista envuelta.
+    """
+
+    def __init__(self, lista, limite=1000):
+        self._lista = lista
+        self._hechos = deque(maxlen=limite)   # (operación, operación inversa), el último al final
+        self._deshechos = []                  # Pasos deshechos que se pueden rehacer
+
+    def __len__(self):
+        return len(self._lista)
+
+    def __getattr__(self, nombre):
+        return getattr(self._lista, nombre)
+
+    def _anotar(self, hacer, deshacer):
+        # Cada operación es (nombre del método, argumentos)
+        self._hechos.append((hacer, deshacer))
+        self._deshechos.clear()   # Un cambio nuevo descarta lo que se podía rehacer
+
+    # ---------- CAMBIOS QUE SE PUEDEN DESHACER ----------
+    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
+        ok = self._lista.insertar_producto(codigo, nombre, categoria, precio, stock)
+        if ok:
+            self._anotar(("insertar_producto", (codigo, nombre, categoria, precio, stock)),
+                         ("eliminar_producto", (codigo,)))
+        return ok
+
+    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
+        antes = self._lista.buscar_nodo(codigo)
+        if antes is None:
+            return False
+        # Se guardan solo los valores anteriores de los campos que cambian
+        nuevos = (nombre, categoria, precio, stock)
+        previos = tuple(None if nuevo is None else getattr(antes, campo)
+                        for campo, nuevo in zip(("nombre", "categoria", "precio", "stock"), nuevos))
+        ok = self._lista.actualizar_producto(codigo, *nuevos)
+        if ok:
+            self._anotar(("actualizar_producto", (codigo, *nuevos)),
+                         ("actualizar_producto", (codigo, *previos)))
+        return ok
+
+    def eliminar_producto(self, codigo):
+        antes = self._lista.buscar_nodo(codigo)
+        if antes is None:
+            return False
+        datos = tuple(getattr(antes, campo) for campo in CAMPOS)
+        ok = self._lista.eliminar_producto(codigo)
+        if ok:
+            self._anotar(("eliminar_producto", (codigo,)), ("insertar_producto", datos))
+        return ok
+
+    def ajustar_stock(self, codigo, cantidad):
+        ok = self._lista.ajustar_stock(codigo, cantidad)
+        if ok:
+            self._anotar(("ajustar_stock", (codigo, cantidad)), ("ajustar_stock", (codigo, -cantidad)))
+        return ok
+
+    def ajustar_stock_lote(self, movimientos):
+        movimientos = list(movimientos)
+        fallas = self._lista.ajustar_stock_lote(movimientos)
+        if not fallas:
+            inversos = [(codigo, -cantidad) for codigo, cantidad in reversed(movimientos)]
+            self._anotar(("ajustar_stock_lote", (movimientos,)), ("ajustar_stock_lote", (inversos,)))
+        return fallas
+
+    def insertar_lote(self, filas):
+        rechazadas = self._lista.insertar_lote(filas)
+        self.olvidar()   # Los pasos anteriores ya no se podrían deshacer en orden
+        return rechazadas
+
+    # ---------- DESHACER Y REHACER ----------
+    def puede_deshacer(self):
+        return bool(self._hechos)
+
+    def puede_rehacer(self):
+        return bool(self._deshechos)
+
+    def deshacer(self):
+        """Deshace el último cambio. Devuelve False si no había nada que deshacer."""
+        if not self._hechos:
+            return False
+        paso = self._hechos.pop()
+        if not self._aplicar(paso[1]):
+            return False
+        self._deshechos.append(paso)
+        return True
+
+    def rehacer(self):
+        """Vuelve a aplicar el último cambio deshecho. Devuelve False si no había ninguno."""
+        if not self._deshechos:
+            return False
+        paso = self._deshechos.pop()
+        if not self._aplicar(paso[0]):
+            return False
+        self._hechos.append(paso)
+        return True
+
+    def _aplicar(self, operacion):
+        metodo, args = operacion
+        resultado = getattr(self._lista, metodo)(*args)
+        if resultado is True or resultado == []:   # ajustar_stock_lote devuelve sus fallas
+            return True
+        # La lista cambió por fuera del historial: los pasos guardados ya no valen
+        self.olvidar()
+        return False
+
+    def olvidar(self):
+        """Borra todos los pasos (por ejemplo, después de cambios que no pasaron por aquí)."""
+        self._hechos.clear()
+        self._deshechos.clear()
+
+# ------------------- BÚSQUEDA MIENTRAS SE ESCRIBE -------------------
+class BuscadorIncremental:
+    """
+    Filtra por nombre y categoría pensando en búsquedas que se repiten o se alargan letra a letra.
+
+    Guarda los resultados de las últimas `capacidad` búsquedas, sin pasar de `max_filas`
+    filas entre todas (se descartan las más viejas). Una búsqueda con más de la mitad de
+    `max_filas` resultados no se guarda: "a" en un catálogo de un millón ocuparía unos
+    50 MB y sirve poco de base. Si la búsqueda nueva contiene a una anterior ("lap" -> "lapi"), se filtra sobre
+    esos resultados en vez de sobre todo el catálogo. Cuando cambian los productos
+    hay que llamar a invalidar().
+    """
+
+    def __init__(self, lista, capacidad=32, max_filas=100_000):
+        self.lista = lista
+        self.capacidad = capacidad
+        self.max_filas = max_filas
+        self._recientes = OrderedDict()   # (nombre, categoria) en minúsculas -> resultados
+        self._filas = 0                   # Filas guardadas entre todas las búsquedas
+        self._generacion = 0              # Cambia con cada invalidar()
+
+    def invalidar(self):
+        self._generacion += 1
+        self._recientes.clear()
+        self._filas = 0
+
+    def buscar(self, nombre_substr="", categoria="", progreso=None):
+        # Con `progreso` (si corre en segundo plano) avisa cuántos productos lleva revisados
+        # y se puede cancelar
+        generacion = self._generacion
+        clave = (nombre_substr.lower(), categoria.lower())
+        if clave in self._recientes:
+            self._recientes.move_to_end(clave)
+            return self._recientes[clave]
+
+        base = self._mejor_base(clave)
+        if base is None:
+            resultados = list(self.lista.recorrer_filtrado(nombre_substr, categoria,
+                                                           progreso=progreso))
+        else:   # Solo hay que revisar lo que ya cumplía una búsqueda más corta
+            nombre, cat = clave
+            if progreso is not None:
+                base = avisando(base, progreso)
+            resultados = [p for p in base
+                          if nombre in p["nombre"].lower() and cat in p["categoria"].lower()]
+
+        if generacion == self._generacion:   # Si cambiaron los productos mientras tanto, no se guarda
+            self._guardar(clave, resultados)
+        return resultados
+
+    def _guardar(self, clave, resultados):
+        if len(resultados) > self.max_filas // 2:
+            return
+        self._recientes[clave] = resultados
+        self._filas += len(resultados)
+        while len(self._recientes) > self.capacidad or self._filas > self.max_filas:
+            self._filas -= len(self._recientes.popitem(last=False)[1])
+
+    def _mejor_base(self, clave):
+        # De las búsquedas guardadas que la nueva contiene, la que tiene menos resultados
+        nombre, cat = clave
+        base = None
+        for (nombre_ant, cat_ant), resultados in self._recientes.items():
+            if nombre_ant in nombre and cat_ant in cat and (base is None or len(resultados) < len(base)):
+                base = resultados
+        return base
+
+# ------------------- TAREAS EN SEGUNDO PLANO -------------------
+class TareaCancelada(Exception):
+    """La lanza Progreso.avisar() cuando alguien pidió cancelar la tarea."""
+
+
+class Progreso:
+    # Lo comparten la tarea (que avisa cuánto lleva) y la ventana (que lo muestra o cancela)
+    def __init__(self):
+        self.hechos = 0
+        self.total = None       # None si no se sabe cuántos son
+        self.cancelado = False
+
+    def avisar(self, hechos, total=None):
+        """Anota el avance; si se pidió cancelar, corta la tarea con TareaCancelada."""
+        self.hechos = hechos
+        if total is not None:
+            self.total = total
+        if self.cancelado:
+            raise TareaCancelada()
+
+    def cancelar(self):
+        self.cancelado = True
+
+
+def avisando(elementos, progreso, cada=4096):
+    """
+    Entrega los elementos tal cual y cada `cada` le avisa a `progreso` cuántos lleva. Se
+    pone sobre lo que se revisa, no sobre lo que se encuentra: una búsqueda que recorre
+    un millón de productos y encuentra diez igual muestra su avance y se puede cancelar.
+    """
+    for i, elemento in enumerate(elementos):
+        if i % cada == 0:
+            progreso.avisar(i)
+        yield elemento
+
+
+class TareasEnSegundoPlano:
+    """
+    Corre funciones largas en hilos aparte y entrega sus resultados en el hilo de Tk.
+
+    Tk solo se puede usar desde su propio hilo, así que las tareas nunca lo tocan:
+    cada `cada_ms` milisegundos se revisa con root.after qué tareas terminaron y se
+    llama a `al_terminar` (o `al_fallar`, o `al_cancelar` si se detuvo con TareaCancelada);
+    a las que siguen corriendo, a `al_avanzar`. Cada tarea recibe un Progreso como último
+    argumento para avisar y poder cancelarse.
+    """
+
+    def __init__(self, root, hilos=1, cada_ms=50):
+        self.root = root
+        self.cada_ms = cada_ms
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="tarea-inventario")
+        self._activas = []        # (futuro, progreso, al_terminar, al_fallar, al_cancelar, al_avanzar)
+        self._revision = None     # Próxima revisión programada con after
+
+    def lanzar(self, funcion, *args, al_terminar=None, al_fallar=None, al_cancelar=None,
+               al_avanzar=None):
+        """Empieza funcion(*args, progreso) en otro hilo y devuelve su Progreso."""
+        progreso = Progreso()
+        futuro = self._pool.submit(funcion, *args, progreso)
+        self._activas.append((futuro, progreso, al_terminar, al_fallar, al_cancelar, al_avanzar))
+        if self._revision is None:
+            self._revision = self.root.after(self.cada_ms, self._revisar)
+        return progreso
+
+    def _revisar(self):
+        self._revision = None
+        terminadas = [t for t in self._activas if t[0].done()]
+        self._activas = [t for t in self._activas if not t[0].done()]
+        for futuro, progreso, al_terminar, al_fallar, al_cancelar, _ in terminadas:
+            try:
+                resultado = futuro.result()
+            except TareaCancelada:
+                if al_cancelar:   # Recién ahora el hilo dejó de usar la lista
+                    al_cancelar()
+            except Exception as e:
+                if al_fallar:
+                    al_fallar(e)
+                else:
+                    messagebox.showerror("Error", str(e))
+            else:
+                if al_terminar:
+                    al_terminar(resultado)
+        for _, progreso, _, _, _, al_avanzar in self._activas:
+            if al_avanzar:
+                al_avanzar(progreso)
+        if self._activas and self._revision is None:
+            self._revision = self.root.after(self.cada_ms, self._revisar)
+
+    def cerrar(self):
+        """Cancela lo que esté corriendo y espera a que los hilos terminen."""
+        for _, progreso, *_ in self._activas:
+            progreso.cancelar()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def leer_precio(texto):
+    """Convierte el texto en precio; "nan" e "inf" no sirven (no se pueden ordenar)."""
+    precio = float(texto)
+    if not math.isfinite(precio):
+        raise ValueError(f"Precio inválido: {texto}")
+    return precio
+
+
+def importar_csv(lista, ruta, progreso, lote=10_000):
+    """
+    Agrega los productos de un CSV con encabezado codigo,nombre,categoria,precio,stock.
+    Entran de a `lote` filas con insertar_lote; si se cancela, quedan las ya agregadas.
+    Devuelve (cantidad agregada, filas rechazadas como (número de fila, código, motivo)).
+    """
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.reader(f))[1:]   # Sin el encabezado
+    agregados, rechazadas = 0, []
+    for inicio in range(0, len(filas), lote):
+        progreso.avisar(inicio, len(filas))
+        productos, posiciones = [], []
+        for i, fila in enumerate(filas[inicio:inicio + lote], start=inicio):
+            try:
+                codigo, nombre, categoria, precio, stock = fila
+                productos.append((codigo, nombre, categoria, leer_precio(precio), int(stock)))
+                posiciones.append(i)
+            except ValueError:
+                rechazadas.append((i + 2, fila[0] if fila else None, "Fila inválida"))
+        fallas = lista.insertar_lote(productos)
+        rechazadas += [(posiciones[i] + 2, codigo, motivo) for i, codigo, motivo in fallas]
+        agregados += len(productos) - len(fallas)
+    progreso.avisar(len(filas), len(filas))
+    rechazadas.sort()   # Por número de fila
+    return agregados, rechazadas
+
+
+def exportar_csv(lista, ruta, progreso):
+    """Guarda todos los productos en un CSV; si se cancela no deja el archivo a medias."""
+    total = len(lista)
+    try:
+        with open(ruta + ".tmp", "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(CAMPOS)
+            for i, p in enumerate(lista.recorrer()):
+                if i % 10_000 == 0:
+                    progreso.avisar(i, total)
+                escritor.writerow([p[c] for c in CAMPOS])
+        os.replace(ruta + ".tmp", ruta)
+    except TareaCancelada:
+        os.remove(ruta + ".tmp")
+        raise
+    return total
+
+
+def exportar_kardex_csv(kardex, ruta, progreso):
+    """Guarda todos los movimientos del kardex en un CSV, igual que exportar_csv."""
+    total = len(kardex)
+    try:
+        with open(ruta + ".tmp", "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["fecha", "codigo", "categoria", "movimiento", "saldo"])
+            for i, (tiempo, codigo, categoria, delta, saldo) in enumerate(kardex.recorrer()):
+                if i % 10_000 == 0:
+                    progreso.avisar(i, total)
+                fecha = datetime.fromtimestamp(tiempo).isoformat(sep=" ", timespec="seconds")
+                escritor.writerow([fecha, codigo, categoria, delta, saldo])
+        os.replace(ruta + ".tmp", ruta)
+    except TareaCancelada:
+        os.remove(ruta + ".tmp")
+        raise
+    return total
+
+# ------------------- LISTA VIRTUAL PARA MOSTRAR PRODUCTOS -------------------
+def formatear_producto(p):
+    """Texto de una fila de la lista de productos."""
+    return (f"Código: {p['codigo']} | Nombre: {p['nombre']} | "
+            f"Categoría: {p['categoria']} | "
+            f"Precio: ${p['precio']:.2f} | Stock: {p['stock']}\n")
+
+
+class ListaVirtual(tk.Frame):
+    """
+    Muestra productos de una lista de cualquier largo escribiendo solo las filas visibles.
+
+    Los productos se van sacando del recorrido a medida que se baja con la barra o la
+    rueda del ratón (nunca antes), y en pantalla solo se formatean las `alto` filas que
+    se ven. Mostrar un catálogo de un millón de productos tarda lo mismo que uno de diez.
+    """
+
+    def __init__(self, parent, alto=13, ancho=80):
+        super().__init__(parent, bg=parent["bg"])
+        self.alto = alto
+        self.texto = tk.Text(self, height=alto, width=ancho, wrap="none",
+                             bg="#262626", fg="#00ffcc", insertbackground="white",
+                             state="disabled")
+        self.barra = tk.Scrollbar(self, command=self._barra_movida)
+        self.texto.pack(side=tk.LEFT)
+        self.barra.pack(side=tk.RIGHT, fill=tk.Y)
+        for evento in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.texto.bind(evento, self._rueda)
+
+        self._filas = []          # Productos ya sacados del recorrido
+        self._fuente = iter(())   # Lo que queda del recorrido
+        self._agotada = True
+        self._total = None        # Cantidad total, si se conoce (para la barra)
+        self.inicio = 0           # Primera fila visible
+
+    def mostrar(self, productos, total=None):
+        """Empieza a mostrar un recorrido nuevo desde el principio."""
+        self._filas = []
+        self._fuente = iter(productos)
+        self._agotada = False
+        self._total = total
+        self.desplazar_a(0)
+
+    def _traer(self, hasta):
+        # Saca del recorrido lo justo para tener `hasta` filas
+        faltan = hasta - len(self._filas)
+        if faltan > 0 and not self._agotada:
+            lote = list(islice(self._fuente, faltan))
+            self._filas.extend(lote)
+            self._agotada = len(lote) < faltan
+
+    def _largo(self):
+        # Largo para la barra: el real si ya se conoce; si no, lo traído más una página
+        if self._agotada:
+            return len(self._filas)
+        if self._total is not None:
+            return max(self._total, len(self._filas))
+        return len(self._filas) + self.alto
+
+    def desplazar_a(self, inicio):
+        """Deja `inicio` como primera fila visible y vuelve a escribir la pantalla."""
+        self._traer(inicio + self.alto + 1)   # Una de más para saber si sigue habiendo
+        self.inicio = max(0, min(inicio, len(self._filas) - self.alto))
+
+        self.texto.config(state="normal")
+        self.texto.delete(1.0, tk.END)
+        if self._filas:
+            visibles = self._filas[self.inicio:self.inicio + self.alto]
+            self.texto.insert(tk.END, "".join(formatear_producto(p) for p in visibles))
+        else:
+            self.texto.insert(tk.END, "No hay productos.")  # Si no hay productos
+        self.texto.config(state="disabled")
+
+        largo = max(self._largo(), 1)
+        self.barra.set(self.inicio / largo, min(1.0, (self.inicio + self.alto) / largo))
+
+    def _barra_movida(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self.desplazar_a(int(float(cantidad) * self._largo()))
+        elif accion == "scroll":
+            paso = int(cantidad) * (self.alto if unidad == "pages" else 1)
+            self.desplazar_a(self.inicio + paso)
+
+    def _rueda(self, evento):
+        arriba = evento.num == 4 or getattr(evento, "delta", 0) > 0
+        self.desplazar_a(self.inicio + (-3 if arriba else 3))
+        return "break"
 
 # ------------------- CLASE APP TKINTER -------------------
 class App:
     # Esta clase crea la ventana principal y controla la interacción con el usuario
-    def __init__(self, root):
+    def __init__(self, root, lista=None):
         self.root = root
         self.root.title("Gestor de Productos Escolares")  # Título de la ventana
         self.root.configure(bg="#1a1a1a")                 # Color de fondo oscuro
         self.root.option_add("*Font", "Helvetica 11")     # Fuente general de texto
 
-        self.lista = ListaEnlazada()                       # Aquí se guardan los productos
+        # Aquí se guardan los productos (se puede pasar una lista ya cargada o persistente).
+        # Los cambios pasan por un historial para poder deshacerlos y rehacerlos.
+        self.lista = HistorialCambios(lista if lista is not None else ListaEnlazada())
+        self.buscador = BuscadorIncremental(self.lista)   # Filtro en vivo con resultados recientes
+        # Kardex de esta sesión: todos los movimientos de stock (si el motor los informa)
+        self.kardex = None
+        if hasattr(self.lista, "conectar_kardex"):
+            self.kardex = Kardex()
+            self.lista.conectar_kardex(self.kardex)
+        # Un solo hilo de trabajo: la lista no admite dos tareas a la vez
+        self.tareas = TareasEnSegundoPlano(root, hilos=1)
+        self._tarea = None            # (progreso, es_filtro) de la tarea en curso
+        self._botones = []            # Botones que se desactivan mientras corre una tarea
         self.titulo_font = font.Font(family="Helvetica", size=16, weight="bold")
 
         # Texto con el título grande y visible
         tk.Label(root, text="GESTOR DE PRODUCTOS ESCOLARES",
                  fg="#00ffcc", bg="#1a1a1a", font=self.titulo_font).pack(pady=10)
 
-        # Área de texto donde se mostrarán los productos
-        self.resultado = tk.Text(root, height=13, width=80,
-                                 bg="#262626", fg="#00ffcc",
-                                 insertbackground="white")
+        # Área donde se mostrarán los productos (solo se escriben las filas visibles)
+        self.resultado = ListaVirtual(root, alto=13, ancho=80)
         self.resultado.pack(pady=10)
 
-        # Barra con botones principales para acciones (insertar, editar, mostrar, etc)
+        # Botones en dos filas para que entren en una pantalla común: arriba los que cambian
+        # productos, abajo las consultas y los archivos (ordenar y CSV son menús)
         barra = tk.Frame(root, bg="#1a1a1a")
-        barra.pack(pady=5)
-
-        # Botones para distintas acciones
+        barra.pack(pady=(5, 0))
         self._btn(barra, "Insertar", self.ventana_insertar)
         self._btn(barra, "Editar", self.ventana_editar)
-        self._btn(barra, "Mostrar", self.mostrar_productos)
         self._btn(barra, "Eliminar", self.ventana_eliminar)
         self._btn(barra, "Entrada Stock", self.ventana_entrada)
         self._btn(barra, "Salida Stock", self.ventana_salida)
-        self._btn(barra, "Filtrar", self.ventana_filtrar)
+        self._btn(barra, "Deshacer", self.deshacer, bg="#666666", fg="white")
+        self._btn(barra, "Rehacer", self.rehacer, bg="#666666", fg="white")
+        self.root.bind("<Control-z>", lambda e: self.deshacer())
+        self.root.bind("<Control-y>", lambda e: self.rehacer())
+
+        consultas = tk.Frame(root, bg="#1a1a1a")
+        consultas.pack(pady=5)
+        self._btn(consultas, "Mostrar", self.mostrar_productos)
+        self._btn(consultas, "Filtrar", self.ventana_filtrar)
+        # Menú para ordenar la lista por diferentes criterios
+        self._menu_btn(consultas, "Ordenar", [
+            ("Por nombre", lambda: self.ordenar("nombre")),
+            ("Por precio", lambda: self.ordenar("precio")),
+            ("Por categoría", lambda: self.ordenar("categoria")),
+            ("Por stock", lambda: self.ordenar("stock")),
+        ], bg="#0099cc", fg="white")
+        self._btn(consultas, "Stock Bajo", lambda: self.mostrar_top("stock", 20), bg="#cc9900")
+        self._btn(consultas, "Top K", self.ventana_top, bg="#cc9900")
+        self._btn(consultas, "Umbrales", self.ventana_umbrales, bg="#cc9900")
+        self._btn(consultas, "Resumen", self.ventana_resumen, bg="#cc9900")
+        archivos = [("Importar CSV", self.importar), ("Exportar CSV", self.exportar)]
+        if self.kardex is not None:
+            archivos.append(("Exportar kardex", self.exportar_kardex))
+        self._menu_btn(consultas, "CSV", archivos, bg="#666666", fg="white")
 
-        # Botones para ordenar la lista por diferentes criterios
-        self._btn(barra, "Ord. Nombre", lambda: self.ordenar("nombre"), bg="#0099cc", fg="white")
-        self._btn(barra, "Ord. Precio", lambda: self.ordenar("precio"), bg="#0099cc", fg="white")
-        self._btn(barra, "Ord. Categoría", lambda: self.ordenar("categoria"), bg="#0099cc", fg="white")
-        self._btn(barra, "Ord. Stock", lambda: self.ordenar("stock"), bg="#0099cc", fg="white")
+        # Avance de la tarea que corre en segundo plano, con botón para cancelarla
+        estado = tk.Frame(root, bg="#1a1a1a")
+        estado.pack(pady=5)
+        self.estado = tk.Label(estado, text="", width=40, anchor="w", bg="#1a1a1a", fg="white")
+        self.estado.pack(side=tk.LEFT, padx=4)
+        self.avance = ttk.Progressbar(estado, length=250, maximum=100)
+        self.avance.pack(side=tk.LEFT, padx=4)
+        self.btn_cancelar = tk.Button(estado, text="Cancelar", command=self.cancelar_tarea,
+                                      width=12, bg="#cc3300", fg="white", state="disabled")
+        self.btn_cancelar.pack(side=tk.LEFT, padx=4)
+
+        # Panel con los productos que llegaron a su umbral de reposición (solo si el motor lo permite)
+        self.alertas = None
+        if hasattr(self.lista, "alertas"):
+            panel = tk.Frame(root, bg="#1a1a1a")
+            panel.pack(pady=5)
+            self.titulo_alertas = tk.Label(panel, text="", bg="#1a1a1a", fg="#ff6666")
+            self.titulo_alertas.pack(anchor="w")
+            self.alertas = tk.Listbox(panel, height=5, width=80, bg="#262626", fg="#ff6666")
+            self.alertas.pack()
+            self._mostrar_alertas()
 
         # Espacio donde se mostrarán los formularios para insertar, editar, eliminar, etc.
         self.frm = tk.Frame(root, bg="#1a1a1a")
         self.frm.pack(pady=10)
+        self._formularios = {}     # Nombre -> Frame del formulario, ya construido
+        self._form_actual = None   # Formulario que se está mostrando
+
+        # Lo recuperado del disco llega con los índices sin armar: se arman en segundo plano
+        self._preparar_indices()
 
     # ------------ FUNCIONES AUXILIARES ------------
     def _btn(self, parent, text, cmd, bg="#00cc99", fg="black"):
         """Crea un botón con texto, color y acción definida."""
-        tk.Button(parent, text=text, command=cmd, width=12, bg=bg, fg=fg).pack(side=tk.LEFT, padx=4)
+        boton = tk.Button(parent, text=text, command=cmd, width=12, bg=bg, fg=fg)
+        boton.pack(side=tk.LEFT, padx=4)
+        self._botones.append(boton)
+
+    def _menu_btn(self, parent, text, opciones, bg="#00cc99", fg="black"):
+        """Crea un botón que despliega un menú con las opciones (texto, acción) dadas."""
+        boton = tk.Menubutton(parent, text=text + " ▾", width=12, bg=bg, fg=fg,
+                              relief="raised", activebackground=bg)
+        menu = tk.Menu(boton, tearoff=0)
+        for texto, accion in opciones:
+            menu.add_command(label=texto, command=accion)
+        boton["menu"] = menu
+        boton.pack(side=tk.LEFT, padx=4)
+        self._botones.append(boton)
 
     def _vaciar_frm(self):
-        """Limpia el espacio donde se muestran los formularios (para que no se mezclen)."""
-        for w in self.frm.winfo_children():
-            w.destroy()
-
-    def _mostrar_lista(self, lista):
-        """Muestra en la ventana la lista de productos que se le pase."""
-        self.resultado.delete(1.0, tk.END)  # Borra texto anterior
-        if not lista:
-            self.resultado.insert(tk.END, "No hay productos.")  # Si no hay productos
+        """Oculta el formulario que se esté mostrando (queda guardado para la próxima vez)."""
+        if self._form_actual is not None:
+            self._form_actual.pack_forget()
+            self._form_actual = None
+
+    def _abrir_formulario(self, nombre):
+        """
+        Muestra el formulario `nombre` con sus campos vacíos y sus casillas sin marcar. Los
+        formularios se construyen una sola vez: la primera vez devuelve un Frame vacío para
+        armarlo; después, None.
+        """
+        self._vaciar_frm()
+        frm = self._formularios.get(nombre)
+        nuevo = frm is None
+        if nuevo:
+            frm = self._formularios[nombre] = tk.Frame(self.frm, bg="#1a1a1a")
         else:
-            for p in lista:
-                self.resultado.insert(
-                    tk.END,
-                    f"Código: {p['codigo']} | Nombre: {p['nombre']} | "
-                    f"Categoría: {p['categoria']} | "
-                    f"Precio: ${p['precio']:.2f} | Stock: {p['stock']}\n"
-                )
+            # Se limpia lo que quedó de la vez anterior, también dentro de marcos anidados
+            pendientes = frm.winfo_children()
+            while pendientes:
+                w = pendientes.pop()
+                if isinstance(w, tk.Entry):
+                    w.delete(0, tk.END)
+                elif isinstance(w, tk.Checkbutton):
+                    w.deselect()
+                pendientes.extend(w.winfo_children())
+        frm.pack()
+        self._form_actual = frm
+        return frm if nuevo else None
+
+    def _productos_cambiados(self):
+        """Después de cambiar productos: los filtros guardados ya no sirven y se muestra todo."""
+        self.buscador.invalidar()
+        self._mostrar_alertas()
+        self.mostrar_productos()
+
+    def _mostrar_alertas(self, limite=50):
+        """Actualiza el panel de reposición; solo lee las primeras alertas de la cola."""
+        if self.alertas is None:
+            return
+        self.titulo_alertas.config(text=f"Productos para reponer: {self.lista.cantidad_alertas()}")
+        self.alertas.delete(0, tk.END)
+        for p in self.lista.alertas(limite):
+            self.alertas.insert(tk.END, f"Código: {p['codigo']} | {p['nombre']} | "
+                                        f"{p['categoria']} | Stock: {p['stock']}")
+
+    def _mostrar_lista(self, lista, total=None):
+        """Muestra en la ventana los productos que se le pasen (lista o recorrido de vistas)."""
+        self.resultado.mostrar(lista, total)
 
     # ------------ FUNCIONES PARA CADA VENTANA (INSERTAR, EDITAR, ELIMINAR, ETC.) ------------
 
     def ventana_insertar(self):
         """Formulario para añadir un nuevo producto."""
-        self._vaciar_frm()
+        frm = self._abrir_formulario("insertar")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
 
         labels = ["Código (numérico):", "Nombre:", "Categoría:",
                   "Precio (decimal):", "Stock (entero):"]
         entries = []
         for i, lbl in enumerate(labels):
-            tk.Label(self.frm, text=lbl, bg="#1a1a1a", fg="white")\
+            tk.Label(frm, text=lbl, bg="#1a1a1a", fg="white")\
               .grid(row=i, column=0, sticky="e", padx=4, pady=4)
-            e = tk.Entry(self.frm, width=25)
+            e = tk.Entry(frm, width=25)
             e.grid(row=i, column=1, padx=4, pady=4)
             entries.append(e)
 
@@ -230,11 +1492,13 @@ class App:
                 return
             # Validar que precio sea un número decimal válido
             try:
-                precio = float(precio_t)
+                precio = leer_precio(precio_t)
             except ValueError:
                 messagebox.showerror("Error", "Precio inválido.")
                 return
 
+            if self._tarea_en_curso():
+                return
             # Intentar agregar el producto
             insertado = self.lista.insertar_producto(codigo, nombre, categoria, precio, int(stock_t))
             if not insertado:
@@ -243,30 +1507,32 @@ class App:
 
             messagebox.showinfo("Éxito", "Producto agregado.")
             for e in entries: e.delete(0, tk.END)  # Limpiar los campos
-            self.mostrar_productos()
+            self._productos_cambiados()
 
-        btn_insertar = tk.Button(self.frm, text="Agregar Producto",
+        btn_insertar = tk.Button(frm, text="Agregar Producto",
                                  bg="#00cc99", fg="black", width=20,
                                  command=insertar)
         btn_insertar.grid(row=len(labels), column=0, columnspan=2, pady=10)
 
     def ventana_editar(self):
         """Formulario para modificar los datos de un producto existente."""
-        self._vaciar_frm()
+        frm = self._abrir_formulario("editar")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
 
         # Pedir código del producto y los nuevos datos (puede dejar vacíos los que no quiera cambiar)
-        tk.Label(self.frm, text="Código del producto:", bg="#1a1a1a", fg="white")\
+        tk.Label(frm, text="Código del producto:", bg="#1a1a1a", fg="white")\
           .grid(row=0, column=0, sticky="e", padx=4, pady=4)
-        codigo_e = tk.Entry(self.frm, width=25)
+        codigo_e = tk.Entry(frm, width=25)
         codigo_e.grid(row=0, column=1, padx=4, pady=4)
 
         campos = ["Nuevo nombre (opcional):", "Nueva categoría (opcional):",
                   "Nuevo precio (opcional):", "Nuevo stock (opcional):"]
         entries = []
         for i, c in enumerate(campos, start=1):
-            tk.Label(self.frm, text=c, bg="#1a1a1a", fg="white")\
+            tk.Label(frm, text=c, bg="#1a1a1a", fg="white")\
               .grid(row=i, column=0, sticky="e", padx=4, pady=4)
-            e = tk.Entry(self.frm, width=25)
+            e = tk.Entry(frm, width=25)
             e.grid(row=i, column=1, padx=4, pady=4)
             entries.append(e)
 
@@ -284,7 +1550,7 @@ class App:
             precio = None
             if precio_t:
                 try:
-                    precio = float(precio_t)
+                    precio = leer_precio(precio_t)
                 except ValueError:
                     messagebox.showerror("Error", "Precio inválido.")
                     return
@@ -295,24 +1561,28 @@ class App:
                     return
                 stock = int(stock_t)
 
+            if self._tarea_en_curso():
+                return
             actualizado = self.lista.actualizar_producto(codigo, nombre, categoria, precio, stock)
             if not actualizado:
                 messagebox.showerror("Error", "Producto no encontrado.")
                 return
             messagebox.showinfo("Éxito", "Producto actualizado.")
-            self.mostrar_productos()
+            self._productos_cambiados()
 
-        btn_editar = tk.Button(self.frm, text="Actualizar Producto",
+        btn_editar = tk.Button(frm, text="Actualizar Producto",
                                bg="#00cc99", fg="black", width=20,
                                command=editar)
         btn_editar.grid(row=len(campos)+1, column=0, columnspan=2, pady=10)
 
     def ventana_eliminar(self):
         """Formulario para eliminar un producto por código."""
-        self._vaciar_frm()
-        tk.Label(self.frm, text="Código del producto a eliminar:", bg="#1a1a1a", fg="white")\
+        frm = self._abrir_formulario("eliminar")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
+        tk.Label(frm, text="Código del producto a eliminar:", bg="#1a1a1a", fg="white")\
           .grid(row=0, column=0, sticky="e", padx=4, pady=4)
-        codigo_e = tk.Entry(self.frm, width=25)
+        codigo_e = tk.Entry(frm, width=25)
         codigo_e.grid(row=0, column=1, padx=4, pady=4)
 
         def eliminar():
@@ -320,29 +1590,33 @@ class App:
             if not codigo:
                 messagebox.showerror("Error", "Debe ingresar el código.")
                 return
+            if self._tarea_en_curso():
+                return
             eliminado = self.lista.eliminar_producto(codigo)
             if not eliminado:
                 messagebox.showerror("Error", "Producto no encontrado.")
                 return
             messagebox.showinfo("Éxito", "Producto eliminado.")
-            self.mostrar_productos()
+            self._productos_cambiados()
 
-        btn_eliminar = tk.Button(self.frm, text="Eliminar Producto",
+        btn_eliminar = tk.Button(frm, text="Eliminar Producto",
                                  bg="#cc3300", fg="white", width=20,
                                  command=eliminar)
         btn_eliminar.grid(row=1, column=0, columnspan=2, pady=10)
 
     def ventana_entrada(self):
         """Formulario para aumentar stock (entrada)."""
-        self._vaciar_frm()
-        tk.Label(self.frm, text="Código del producto:", bg="#1a1a1a", fg="white")\
+        frm = self._abrir_formulario("entrada")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
+        tk.Label(frm, text="Código del producto:", bg="#1a1a1a", fg="white")\
           .grid(row=0, column=0, sticky="e", padx=4, pady=4)
-        codigo_e = tk.Entry(self.frm, width=25)
+        codigo_e = tk.Entry(frm, width=25)
         codigo_e.grid(row=0, column=1, padx=4, pady=4)
 
-        tk.Label(self.frm, text="Cantidad a ingresar:", bg="#1a1a1a", fg="white")\
+        tk.Label(frm, text="Cantidad a ingresar:", bg="#1a1a1a", fg="white")\
           .grid(row=1, column=0, sticky="e", padx=4, pady=4)
-        cantidad_e = tk.Entry(self.frm, width=25)
+        cantidad_e = tk.Entry(frm, width=25)
         cantidad_e.grid(row=1, column=1, padx=4, pady=4)
 
         def entrada_stock():
@@ -354,29 +1628,33 @@ class App:
             if not cantidad.isdigit():
                 messagebox.showerror("Error", "Cantidad inválida.")
                 return
+            if self._tarea_en_curso():
+                return
             exito = self.lista.ajustar_stock(codigo, int(cantidad))
             if not exito:
                 messagebox.showerror("Error", "Producto no encontrado o cantidad inválida.")
                 return
             messagebox.showinfo("Éxito", "Stock actualizado.")
-            self.mostrar_productos()
+            self._productos_cambiados()
 
-        btn_entrada = tk.Button(self.frm, text="Agregar Stock",
+        btn_entrada = tk.Button(frm, text="Agregar Stock",
                                 bg="#00cc99", fg="black", width=20,
                                 command=entrada_stock)
         btn_entrada.grid(row=2, column=0, columnspan=2, pady=10)
 
     def ventana_salida(self):
         """Formulario para disminuir stock (salida)."""
-        self._vaciar_frm()
-        tk.Label(self.frm, text="Código del producto:", bg="#1a1a1a", fg="white")\
+        frm = self._abrir_formulario("salida")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
+        tk.Label(frm, text="Código del producto:", bg="#1a1a1a", fg="white")\
           .grid(row=0, column=0, sticky="e", padx=4, pady=4)
-        codigo_e = tk.Entry(self.frm, width=25)
+        codigo_e = tk.Entry(frm, width=25)
         codigo_e.grid(row=0, column=1, padx=4, pady=4)
 
-        tk.Label(self.frm, text="Cantidad a retirar:", bg="#1a1a1a", fg="white")\
+        tk.Label(frm, text="Cantidad a retirar:", bg="#1a1a1a", fg="white")\
           .grid(row=1, column=0, sticky="e", padx=4, pady=4)
-        cantidad_e = tk.Entry(self.frm, width=25)
+        cantidad_e = tk.Entry(frm, width=25)
         cantidad_e.grid(row=1, column=1, padx=4, pady=4)
 
         def salida_stock():
@@ -388,58 +1666,427 @@ class App:
             if not cantidad.isdigit():
                 messagebox.showerror("Error", "Cantidad inválida.")
                 return
+            if self._tarea_en_curso():
+                return
             exito = self.lista.ajustar_stock(codigo, -int(cantidad))
             if not exito:
                 messagebox.showerror("Error", "Producto no encontrado o cantidad inválida.")
                 return
             messagebox.showinfo("Éxito", "Stock actualizado.")
-            self.mostrar_productos()
+            self._productos_cambiados()
 
-        btn_salida = tk.Button(self.frm, text="Retirar Stock",
+        btn_salida = tk.Button(frm, text="Retirar Stock",
                                bg="#cc3300", fg="white", width=20,
                                command=salida_stock)
         btn_salida.grid(row=2, column=0, columnspan=2, pady=10)
 
     def ventana_filtrar(self):
-        """Formulario para filtrar productos por nombre y categoría."""
-        self._vaciar_frm()
-        tk.Label(self.frm, text="Buscar por nombre (texto):", bg="#1a1a1a", fg="white")\
+        """Formulario para filtrar productos por nombre, categoría y rangos de precio y stock."""
+        frm = self._abrir_formulario("filtrar")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
+        tk.Label(frm, text="Buscar por nombre (texto):", bg="#1a1a1a", fg="white")\
           .grid(row=0, column=0, sticky="e", padx=4, pady=4)
-        nombre_e = tk.Entry(self.frm, width=25)
+        nombre_e = tk.Entry(frm, width=25)
         nombre_e.grid(row=0, column=1, padx=4, pady=4)
 
-        tk.Label(self.frm, text="Filtrar por categoría (texto):", bg="#1a1a1a", fg="white")\
+        tk.Label(frm, text="Filtrar por categoría (texto):", bg="#1a1a1a", fg="white")\
           .grid(row=1, column=0, sticky="e", padx=4, pady=4)
-        categoria_e = tk.Entry(self.frm, width=25)
+        categoria_e = tk.Entry(frm, width=25)
         categoria_e.grid(row=1, column=1, padx=4, pady=4)
 
+        # Rangos: cada uno con su mínimo y su máximo (vacío = sin límite)
+        rangos_e = {}
+        for fila, (campo, texto) in enumerate((("precio", "Precio entre (decimal):"),
+                                               ("stock", "Stock entre (entero):")), start=2):
+            tk.Label(frm, text=texto, bg="#1a1a1a", fg="white")\
+              .grid(row=fila, column=0, sticky="e", padx=4, pady=4)
+            limites = tk.Frame(frm, bg="#1a1a1a")
+            limites.grid(row=fila, column=1, padx=4, pady=4)
+            minimo_e = tk.Entry(limites, width=10)
+            minimo_e.pack(side=tk.LEFT)
+            tk.Label(limites, text=" y ", bg="#1a1a1a", fg="white").pack(side=tk.LEFT)
+            maximo_e = tk.Entry(limites, width=10)
+            maximo_e.pack(side=tk.LEFT)
+            rangos_e[campo] = (minimo_e, maximo_e)
+
+        # Nombres parecidos: encuentra "Cuaderno" aunque se escriba "cuardeno"
+        tolerar = tk.BooleanVar(value=False)
+        if hasattr(self.lista, "parecidos"):   # No todos los motores tienen este índice
+            tk.Checkbutton(frm, text="Tolerar errores de escritura en el nombre", variable=tolerar,
+                           bg="#1a1a1a", fg="white", selectcolor="#333333",
+                           activebackground="#1a1a1a", command=lambda: filtrar())\
+              .grid(row=4, column=0, columnspan=2, pady=4)
+
+        pendiente = None   # Filtro programado que todavía no se ejecutó
+
         def filtrar():
+            nonlocal pendiente
+            pendiente = None
+            if self._form_actual is not frm:   # Se cambió de formulario mientras se esperaba
+                return
             nombre = nombre_e.get().strip()
             categoria = categoria_e.get().strip()
-            productos_filtrados = self.lista.filtrar(nombre, categoria)
-            self._vaciar_frm()
-            self._mostrar_lista(productos_filtrados)
+            rangos = {}
+            for campo, entradas in rangos_e.items():
+                convertir = leer_precio if campo == "precio" else int
+                try:
+                    limites = [convertir(e.get().strip()) if e.get().strip() else None
+                               for e in entradas]
+                except ValueError:
+                    self.estado.config(text=f"Rango de {campo} inválido.")
+                    return
+                if limites != [None, None]:
+                    rangos[campo] = limites
 
-        btn_filtrar = tk.Button(self.frm, text="Filtrar",
+            def mostrar(productos_filtrados):
+                if self._form_actual is frm:   # Solo si el usuario sigue en el filtro
+                    self._mostrar_lista(productos_filtrados, len(productos_filtrados))
+
+            # Un filtro nuevo reemplaza al que todavía estuviera buscando
+            if tolerar.get() and nombre:
+                self._en_segundo_plano("Buscando parecidos...", self._buscar_parecidos, nombre,
+                                       categoria, rangos, al_terminar=mostrar, es_filtro=True)
+            elif rangos:
+                self._en_segundo_plano("Filtrando...", self._buscar_con_rangos, nombre, categoria,
+                                       rangos, al_terminar=mostrar, es_filtro=True)
+            else:
+                self._en_segundo_plano("Filtrando...", self.buscador.buscar, nombre, categoria,
+                                       al_terminar=mostrar, es_filtro=True)
+
+        def al_escribir(evento):
+            # Filtra cuando se deja de escribir un momento, no en cada tecla
+            nonlocal pendiente
+            if pendiente is not None:
+                self.root.after_cancel(pendiente)
+            pendiente = self.root.after(250, filtrar)
+
+        for e in (nombre_e, categoria_e, *rangos_e["precio"], *rangos_e["stock"]):
+            e.bind("<KeyRelease>", al_escribir)
+
+        btn_filtrar = tk.Button(frm, text="Filtrar",
                                 bg="#0099cc", fg="white", width=20,
                                 command=filtrar)
-        btn_filtrar.grid(row=2, column=0, columnspan=2, pady=10)
+        btn_filtrar.grid(row=5, column=0, columnspan=2, pady=10)
+
+    def _buscar_con_rangos(self, nombre, categoria, rangos, progreso):
+        """
+        Filtro con rangos (corre en segundo plano): el primer rango sale del índice de orden
+        y sobre esos productos se revisan los demás rangos y los textos. Quedan de menor a mayor.
+        """
+        (campo, (minimo, maximo)), *otros = rangos.items()
+        nombre, categoria = nombre.lower(), categoria.lower()
+        resultados = []
+        for p in self.lista.recorrer_rango(campo, minimo, maximo, progreso):   # Avisa por revisados
+            if (nombre in p["nombre"].lower() and categoria in p["categoria"].lower()
+                    and all((mn is None or p[c] >= mn) and (mx is None or p[c] <= mx)
+                            for c, (mn, mx) in otros)):
+                resultados.append(p)
+        return resultados
+
+    def _buscar_parecidos(self, nombre, categoria, rangos, progreso):
+        """
+        Filtro que tolera errores en el nombre (corre en segundo plano): los productos salen
+        del índice de nombres parecidos, de más a menos parecidos, y sobre ellos se revisan
+        la categoría y los rangos.
+        """
+        categoria = categoria.lower()
+        resultados = []
+        for p in avisando(self.lista.parecidos(nombre, limite=None), progreso):
+            if (categoria in p["categoria"].lower()
+                    and all((mn is None or p[c] >= mn) and (mx is None or p[c] <= mx)
+                            for c, (mn, mx) in rangos.items())):
+                resultados.append(p)
+        return resultados
+
+    def ventana_top(self):
+        """Formulario para ver los primeros K productos según un criterio (y una categoría)."""
+        frm = self._abrir_formulario("top")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
+        criterio = tk.StringVar(value="precio")
+        sentido = tk.StringVar(value="Mayor a menor")
+
+        tk.Label(frm, text="Criterio:", bg="#1a1a1a", fg="white")\
+          .grid(row=0, column=0, sticky="e", padx=4, pady=4)
+        tk.OptionMenu(frm, criterio, *CLAVES_ORDEN).grid(row=0, column=1, sticky="w", padx=4, pady=4)
+
+        tk.Label(frm, text="Orden:", bg="#1a1a1a", fg="white")\
+          .grid(row=1, column=0, sticky="e", padx=4, pady=4)
+        tk.OptionMenu(frm, sentido, "Menor a mayor", "Mayor a menor")\
+          .grid(row=1, column=1, sticky="w", padx=4, pady=4)
+
+        tk.Label(frm, text="Cantidad (por defecto 20):", bg="#1a1a1a", fg="white")\
+          .grid(row=2, column=0, sticky="e", padx=4, pady=4)
+        k_e = tk.Entry(frm, width=25)
+        k_e.grid(row=2, column=1, padx=4, pady=4)
+
+        tk.Label(frm, text="Categoría (opcional):", bg="#1a1a1a", fg="white")\
+          .grid(row=3, column=0, sticky="e", padx=4, pady=4)
+        categoria_e = tk.Entry(frm, width=25)
+        categoria_e.grid(row=3, column=1, padx=4, pady=4)
+
+        def ver_top():
+            k_t = k_e.get().strip() or "20"
+            if not k_t.isdigit():
+                messagebox.showerror("Error", "Cantidad debe ser entero.")
+                return
+            categoria = categoria_e.get().strip() or None
+            self.mostrar_top(criterio.get(), int(k_t), sentido.get() == "Menor a mayor", categoria)
+
+        btn_top = tk.Button(frm, text="Ver Primeros",
+                            bg="#cc9900", fg="black", width=20,
+                            command=ver_top)
+        btn_top.grid(row=4, column=0, columnspan=2, pady=10)
+
+    def ventana_umbrales(self):
+        """Formulario para definir el stock mínimo de un producto o de una categoría."""
+        if self.alertas is None:
+            messagebox.showerror("Error", "Este motor de almacenamiento no tiene alertas de stock.")
+            return
+        frm = self._abrir_formulario("umbrales")
+        if frm is None:   # Ya estaba construido: solo se volvió a mostrar vacío
+            return
+        campos = ["Código del producto:", "o Categoría:", "Umbral (vacío = quitar):"]
+        entries = []
+        for i, c in enumerate(campos):
+            tk.Label(frm, text=c, bg="#1a1a1a", fg="white")\
+              .grid(row=i, column=0, sticky="e", padx=4, pady=4)
+            e = tk.Entry(frm, width=25)
+            e.grid(row=i, column=1, padx=4, pady=4)
+            entries.append(e)
+
+        def definir():
+            codigo, categoria, umbral_t = [e.get().strip() for e in entries]
+            if bool(codigo) == bool(categoria):
+                messagebox.showerror("Error", "Indique un código o una categoría (solo uno).")
+                return
+            if umbral_t and not umbral_t.isdigit():
+                messagebox.showerror("Error", "Umbral debe ser entero.")
+                return
+            umbral = int(umbral_t) if umbral_t else None
+
+            def listo(_):
+                self._mostrar_alertas()
+                messagebox.showinfo("Éxito", "Umbral actualizado.")
+
+            # Un umbral de categoría revisa todos sus productos: no se hace en el hilo de Tk
+            self._en_segundo_plano("Actualizando alertas...", self._definir_umbral, codigo,
+                                   categoria, umbral, al_terminar=listo)
+
+        btn_definir = tk.Button(frm, text="Guardar Umbral",
+                                bg="#cc9900", fg="black", width=20,
+                                command=definir)
+        btn_definir.grid(row=len(campos), column=0, columnspan=2, pady=10)
+
+    def _definir_umbral(self, codigo, categoria, umbral, progreso):
+        # Corre en segundo plano
+        if codigo:
+            self.lista.definir_umbral_producto(codigo, umbral)
+        else:
+            self.lista.definir_umbral_categoria(categoria, umbral)
+
+    def ventana_resumen(self):
+        """Reporte por categoría: productos, unidades y valor del inventario."""
+        if not hasattr(self.lista, "resumen_categorias"):
+            messagebox.showerror("Error", "Este motor de almacenamiento no tiene resumen por categoría.")
+            return
+        frm = self._abrir_formulario("resumen")
+        if frm is not None:   # Primera vez: se crea el área del reporte
+            self.texto_resumen = tk.Text(frm, height=10, width=80,
+                                         bg="#262626", fg="#00ffcc")
+            self.texto_resumen.pack()
+
+        filas = self.lista.resumen_categorias()
+        lineas = [f"{'Categoría':<24}{'Productos':>12}{'Unidades':>14}{'Valor':>18}"]
+        for r in filas:
+            lineas.append(f"{r['categoria']:<24}{r['productos']:>12,}{r['unidades']:>14,}"
+                          f"{'$' + format(r['valor'], ',.2f'):>18}")
+        total = sum(r["valor"] for r in filas)
+        lineas.append(f"{'TOTAL':<24}{sum(r['productos'] for r in filas):>12,}"
+                      f"{sum(r['unidades'] for r in filas):>14,}{'$' + format(total, ',.2f'):>18}")
+        self.texto_resumen.config(state="normal")
+        self.texto_resumen.delete(1.0, tk.END)
+        self.texto_resumen.insert(tk.END, "\n".join(lineas))
+        self.texto_resumen.config(state="disabled")
+
+    # ------------ TAREAS LARGAS: IMPORTAR, EXPORTAR ------------
+    def _en_segundo_plano(self, texto, funcion, *args, al_terminar, es_filtro=False):
+        """
+        Corre funcion(*args, progreso) sin congelar la ventana. Mientras corre una tarea que
+        cambia productos se desactivan los botones; un filtro solo reemplaza a otro filtro.
+        La tarea se da por terminada cuando el hilo de verdad dejó de usar la lista, aunque
+        se haya pedido cancelarla antes.
+        """
+        if self._tarea is not None:
+            progreso, era_filtro = self._tarea
+            if not (es_filtro and era_filtro):
+                messagebox.showerror("Error", "Espere a que termine la tarea en curso.")
+                return
+            progreso.cancelar()
+
+        def terminar(resultado):
+            if self._fin_tarea(progreso):   # Un filtro reemplazado por otro no se muestra
+                al_terminar(resultado)
+
+        def fallar(error):
+            if self._fin_tarea(progreso):
+                messagebox.showerror("Error", str(error))
+
+        def cancelada():
+            if self._fin_tarea(progreso) and not es_filtro:
+                self._productos_cambiados()   # Una importación pudo quedar a medias
+
+        if not es_filtro:
+            self._vaciar_frm()
+            for boton in self._botones:
+                boton.config(state="disabled")
+        self.estado.config(text=texto)
+        self.avance["value"] = 0
+        self.btn_cancelar.config(state="normal")
+        progreso = self.tareas.lanzar(funcion, *args, al_terminar=terminar, al_fallar=fallar,
+                                      al_cancelar=cancelada,
+                                      al_avanzar=lambda p: self._mostrar_avance(texto, p))
+        self._tarea = (progreso, es_filtro)
+
+    def _mostrar_avance(self, texto, progreso):
+        if progreso.cancelado:
+            return   # Se sigue mostrando "Cancelando..." hasta que el hilo se detenga
+        if progreso.total:
+            self.avance["value"] = 100 * progreso.hechos / progreso.total
+            self.estado.config(text=f"{texto} {progreso.hechos:,} de {progreso.total:,}")
+        else:
+            self.estado.config(text=f"{texto} {progreso.hechos:,}")
+
+    def _fin_tarea(self, progreso):
+        """Vuelve a habilitar la ventana; devuelve False si la tarea ya había sido reemplazada."""
+        if self._tarea is None or self._tarea[0] is not progreso:
+            return False
+        self._tarea = None
+        self.estado.config(text="")
+        self.avance["value"] = 0
+        self.btn_cancelar.config(state="disabled")
+        for boton in self._botones:
+            boton.config(state="normal")
+        return True
+
+    def _tarea_en_curso(self):
+        """
+        True (y avisa) si corre una tarea en segundo plano. Ningún cambio se hace mientras
+        tanto: el hilo de la tarea está recorriendo los índices de la lista y los filtros
+        guardados, y cambiarlos a la vez los dejaría inconsistentes.
+        """
+        if self._tarea is None:
+            return False
+        messagebox.showerror("Error", "Espere a que termine la tarea en curso.")
+        return True
+
+    def deshacer(self):
+        """Deshace el último cambio (insertar, editar, eliminar o mover stock)."""
+        if self._tarea_en_curso():
+            return
+        if self.lista.deshacer():
+            self._productos_cambiados()
+        else:
+            self.estado.config(text="No hay cambios para deshacer.")
+
+    def rehacer(self):
+        """Vuelve a aplicar el último cambio deshecho."""
+        if self._tarea_en_curso():
+            return
+        if self.lista.rehacer():
+            self._productos_cambiados()
+        else:
+            self.estado.config(text="No hay cambios para rehacer.")
+
+    def cancelar_tarea(self):
+        """
+        Pide a la tarea en curso que se detenga (lo ya hecho no se deshace). La ventana
+        sigue bloqueada hasta que el hilo llegue a su próximo aviso y se detenga.
+        """
+        if self._tarea is not None:
+            self._tarea[0].cancelar()
+            self.btn_cancelar.config(state="disabled")
+            self.estado.config(text="Cancelando...")
+
+    def importar(self):
+        ruta = filedialog.askopenfilename(filetypes=[("CSV", "*.csv")])
+        if not ruta:
+            return
+
+        def listo(resultado):
+            agregados, rechazadas = resultado
+            mensaje = f"Se agregaron {agregados} productos."
+            if rechazadas:
+                mensaje += f" {len(rechazadas)} filas rechazadas (la primera: fila {rechazadas[0][0]}, {rechazadas[0][2]})."
+            self._productos_cambiados()
+            self._preparar_indices()   # La carga dejó los índices para después
+            messagebox.showinfo("Importar", mensaje)
+
+        self._en_segundo_plano("Importando...", importar_csv, self.lista, ruta, al_terminar=listo)
+
+    def exportar_kardex(self):
+        """Guarda en un CSV los movimientos de stock de esta sesión (entradas, salidas, cargas)."""
+        ruta = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not ruta:
+            return
+        self._en_segundo_plano("Exportando kardex...", exportar_kardex_csv, self.kardex, ruta,
+                               al_terminar=lambda total: messagebox.showinfo(
+                                   "Exportar kardex", f"Se guardaron {total} movimientos."))
+
+    def _preparar_indices(self):
+        """Arma en segundo plano los índices pendientes, si el motor los deja para después."""
+        if hasattr(self.lista, "preparar_indices"):
+            self._en_segundo_plano("Preparando índices...", self.lista.preparar_indices,
+                                   al_terminar=lambda _: None)
+
+    def exportar(self):
+        ruta = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not ruta:
+            return
+        self._en_segundo_plano("Exportando...", exportar_csv, self.lista, ruta,
+                               al_terminar=lambda total: messagebox.showinfo(
+                                   "Exportar", f"Se guardaron {total} productos."))
 
     # ------------ FUNCIONES DE MOSTRAR Y ORDENAR ------------
     def mostrar_productos(self):
         """Muestra todos los productos sin ordenar ni filtrar."""
         self._vaciar_frm()
-        productos = self.lista._to_list()
-        self._mostrar_lista(productos)
+        productos = self.lista.recorrer()
+        self._mostrar_lista(productos, len(self.lista))
 
     def ordenar(self, criterio):
         """Muestra los productos ordenados por el criterio dado."""
         self._vaciar_frm()
-        productos = self.lista.ordenar(criterio)
-        self._mostrar_lista(productos)
+        productos = self.lista.recorrer_ordenado(criterio)
+        self._mostrar_lista(productos, len(self.lista))
+
+    def mostrar_top(self, criterio, k, ascendente=True, categoria=None):
+        """Muestra solo los primeros k productos según el criterio (sin ordenar todo)."""
+        # Con categoría se revisan todos sus productos: se busca en segundo plano, como un filtro
+        def mostrar(productos):
+            self._mostrar_lista(productos, len(productos))
+
+        self._en_segundo_plano("Buscando...", self._top_k, criterio, k, ascendente, categoria,
+                               al_terminar=mostrar, es_filtro=True)
+
+    def _top_k(self, criterio, k, ascendente, categoria, progreso):
+        # Corre en segundo plano
+        return self.lista.top_k(criterio, k, ascendente, categoria)
 
 # ------------------- EJECUCIÓN -------------------
 if __name__ == "__main__":
+    from motores import elegir_motor
+
+    # El motor se elige con --motor o INVENTARIO_MOTOR; los productos se guardan en disco
+    # y se recuperan al volver a abrir el programa
+    lista = elegir_motor()
     root = tk.Tk()    # Crea la ventana principal
-    app = App(root)   # Crea la aplicación dentro de esa ventana
+    app = App(root, lista)   # Crea la aplicación dentro de esa ventana
+
+    def cerrar():
+        app.tareas.cerrar()   # Detiene la tarea en segundo plano, si había una
+        lista.cerrar()        # Espera a que los últimos cambios queden escritos
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", cerrar)
     root.mainloop()   # Inicia el ciclo para mostrar la ventana y esperar acciones del usuario
\ No newline at end of file
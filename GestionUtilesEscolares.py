@@ -1,116 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox, font, ttk  # Herramientas de la GUI
-
-# ------------------- CLASE NODO -------------------
-class Nodo:
-    """Representa un producto y el enlace al siguiente en la lista."""
-    def __init__(self, codigo, nombre, categoria, precio, stock):
-        self.codigo = codigo
-        self.nombre = nombre
-        self.categoria = categoria
-        self.precio = precio
-        self.stock = stock
-        self.siguiente = None  # Apuntador al siguiente nodo
-
+from GestionUtiles import ListaEnlazada as ListaIndexada  # Lista con índices de búsqueda
 
 # ------------------- CLASE LISTA ENLAZADA -------------------
-class ListaEnlazada:
-    """Gestiona los productos mediante una lista enlazada simple."""
-    def __init__(self):
-        self.cabeza = None  # Primer nodo (producto)
-
-    # ---------- CRUD ----------
-    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
-        """Añade un producto si el código no existe; devuelve True/False."""
-        if self.buscar_nodo(codigo):
-            return False  # Evitar duplicados
-        nuevo = Nodo(codigo, nombre, categoria, precio, stock)
-        if self.cabeza is None:
-            self.cabeza = nuevo
-        else:
-            actual = self.cabeza
-            while actual.siguiente:
-                actual = actual.siguiente
-            actual.siguiente = nuevo
-        return True
-
-    def buscar_nodo(self, codigo):
-        """Devuelve el nodo con ese código o None si no existe."""
-        actual = self.cabeza
-        while actual:
-            if actual.codigo == codigo:
-                return actual
-            actual = actual.siguiente
-        return None
-
-    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
-        """Actualiza campos indicados de un producto existente."""
-        nodo = self.buscar_nodo(codigo)
-        if not nodo:
-            return False
-        if nombre is not None:
-            nodo.nombre = nombre
-        if categoria is not None:
-            nodo.categoria = categoria
-        if precio is not None:
-            nodo.precio = precio
-        if stock is not None:
-            nodo.stock = stock
-        return True
-
-    def eliminar_producto(self, codigo):
-        """Elimina un producto por código; devuelve True si lo encontró."""
-        actual, anterior = self.cabeza, None
-        while actual:
-            if actual.codigo == codigo:
-                if anterior:
-                    anterior.siguiente = actual.siguiente
-                else:
-                    self.cabeza = actual.siguiente
-                return True
-            anterior, actual = actual, actual.siguiente
-        return False
-
-    # ---------- INVENTARIO ----------
-    def ajustar_stock(self, codigo, cantidad):
-        """
-        Aumenta o disminuye el stock.
-        No permite que el stock sea negativo.
-        """
-        nodo = self.buscar_nodo(codigo)
-        if not nodo or nodo.stock + cantidad < 0:
-            return False
-        nodo.stock += cantidad
-        return True
-
-    # ---------- CONVERSIÓN PARA LA GUI ----------
-    def _to_list(self):
-        """Retorna todos los productos en forma de lista de diccionarios."""
-        productos, actual = [], self.cabeza
-        while actual:
-            productos.append({
-                "codigo": actual.codigo,
-                "nombre": actual.nombre,
-                "categoria": actual.categoria,
-                "precio": actual.precio,
-                "stock": actual.stock
-            })
-            actual = actual.siguiente
-        return productos
-
-    # ---------- ORDENAR ----------
-    def ordenar(self, criterio):
-        """Devuelve la lista ordenada por el criterio dado."""
-        productos = self._to_list()
-        if criterio == "nombre":
-            productos.sort(key=lambda x: x["nombre"].lower())
-        elif criterio == "precio":
-            productos.sort(key=lambda x: x["precio"])
-        elif criterio == "categoria":
-            productos.sort(key=lambda x: x["categoria"].lower())
-        elif criterio == "stock":
-            productos.sort(key=lambda x: x["stock"])
-        return productos
+class ListaEnlazada(ListaIndexada):
+    """Gestiona los productos con la ListaEnlazada de GestionUtiles, que mantiene
+    los índices por código, de orden y de trigramas (filtrar no recorre la lista)."""
 
     # ---------- FILTRAR (ahora incluye código) ----------
     def filtrar(self, codigo_substr="", nombre_substr="", categoria_substr=""):
@@ -118,16 +13,7 @@ class ListaEnlazada:
         Filtra productos cuyos campos contengan las sub-cadenas dadas.
         La búsqueda no distingue mayúsculas/minúsculas.
         """
-        codigo_substr = codigo_substr.lower()
-        nombre_substr = nombre_substr.lower()
-        categoria_substr = categoria_substr.lower()
-
-        return [
-            p for p in self._to_list()
-            if (codigo_substr in p["codigo"].lower())
-            and (nombre_substr in p["nombre"].lower())
-            and (categoria_substr in p["categoria"].lower())
-        ]
+        return super().filtrar(nombre_substr, categoria_substr, codigo_substr)
 
 
 # ------------------- CLASE APP TKINTER -------------------
@@ -0,0 +1,227 @@
+import argparse
+import gc
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+# ------------------- MOTORES A COMPARAR -------------------
+# Las cinco copias de ListaEnlazada del proyecto y los motores alternativos.
+SCRIPTS = ["GestionUtiles", "ejercicio1", "GestionUtilesEscolares", "ej2", "prueba3"]
+CATEGORIAS = ["Cuadernos", "Lápices", "Borradores", "Reglas", "Mochilas", "Colores", "Papel"]
+# tracemalloc solo ve la memoria que pide Python: las páginas y la caché de SQLite las
+# reserva la biblioteca en C. Para esos motores se mide cuánto crece la memoria residente.
+MEDIR_POR_RSS = {"ListaSQLite"}
+PALABRAS = ["lapiz", "cuaderno", "borrador", "regla", "mochila", "color", "papel", "goma",
+            "tijera", "pegamento", "marcador", "carpeta", "compas", "sacapuntas"]
+
+
+def motores():
+    """
+    Devuelve {nombre: función que crea una lista vacía}. Cada función recibe una carpeta
+    de trabajo temporal, que solo usan los motores que guardan en disco.
+    """
+    fabricas = {}
+    for script in SCRIPTS:
+        clase = importlib.import_module(script).ListaEnlazada
+        fabricas[script] = lambda carpeta, clase=clase: clase()
+    from catalogo_columnar import ListaColumnar
+    from catalogo_sqlite import ListaSQLite
+    fabricas["ListaColumnar"] = lambda carpeta: ListaColumnar()
+    fabricas["ListaSQLite"] = lambda carpeta: ListaSQLite(os.path.join(carpeta, "bench.db"))
+    return fabricas
+
+
+def _cerrar(lista):
+    # Los motores en disco tienen que soltar su archivo antes de borrar la carpeta
+    if hasattr(lista, "cerrar"):
+        lista.cerrar()
+
+
+def _memoria_residente():
+    """Memoria residente del proceso en bytes, o None si el sistema no la informa."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def generar_catalogo(n, semilla):
+    """Catálogo sintético reproducible: la misma semilla da siempre los mismos productos."""
+    azar = random.Random(semilla)
+    return [(str(100_000 + i),
+             f"{azar.choice(PALABRAS).capitalize()} {azar.choice(PALABRAS)} {azar.randrange(1000)}",
+             azar.choice(CATEGORIAS),
+             round(azar.uniform(0.5, 50), 2),
+             azar.randrange(500))
+            for i in range(n)]
+
+
+def _filtrar(lista, nombre="", categoria=""):
+    # Las copias no tienen la misma firma de filtrar: se llama por nombre de parámetro
+    parametros = inspect.signature(lista.filtrar).parameters
+    campo_categoria = "categoria_substr" if "categoria_substr" in parametros else "categoria"
+    return lista.filtrar(nombre_substr=nombre, **{campo_categoria: categoria})
+
+
+# ------------------- MEDICIONES -------------------
+def medir(fabricas, nombre, catalogo, semilla, consultas=1000):
+    """
+    Mide cada operación sobre un catálogo; devuelve segundos y memoria máxima. Para los
+    motores de MEDIR_POR_RSS la memoria es lo que crece la memoria residente al cargar el
+    catálogo (None si el sistema no la informa).
+    """
+    fabrica = fabricas[nombre]
+    azar = random.Random(semilla)
+    codigos = [fila[0] for fila in catalogo]
+    resultado = {}
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        lista = fabrica(carpeta)
+        try:
+            resultado.update(_medir_operaciones(lista, catalogo, codigos, azar, consultas))
+        finally:
+            _cerrar(lista)
+    del lista
+    gc.collect()
+
+    if nombre in MEDIR_POR_RSS:
+        resultado["memoria_pico"] = _memoria_por_rss(nombre, catalogo)
+        return resultado
+
+    # La memoria se mide aparte: tracemalloc hace más lento todo lo demás
+    with tempfile.TemporaryDirectory() as carpeta:
+        tracemalloc.start()
+        lista = fabrica(carpeta)
+        try:
+            for fila in catalogo:
+                lista.insertar_producto(*fila)
+            resultado["memoria_pico"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            _cerrar(lista)
+    return resultado
+
+
+def _memoria_por_rss(nombre, catalogo):
+    # En un proceso nuevo: en este, la memoria que soltaron los motores anteriores se
+    # reutiliza y el crecimiento saldría casi cero
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(1) as proceso:
+        return proceso.apply(_crecimiento_residente, (nombre, catalogo))
+
+
+def _crecimiento_residente(nombre, catalogo):
+    fabrica = motores()[nombre]
+    gc.collect()
+    antes = _memoria_residente()
+    if antes is None:
+        return None
+    with tempfile.TemporaryDirectory() as carpeta:
+        lista = fabrica(carpeta)
+        try:
+            for fila in catalogo:
+                lista.insertar_producto(*fila)
+            return max(0, _memoria_residente() - antes)
+        finally:
+            _cerrar(lista)
+
+
+def _medir_operaciones(lista, catalogo, codigos, azar, consultas):
+    resultado = {}
+    inicio = time.perf_counter()
+    for fila in catalogo:
+        lista.insertar_producto(*fila)
+    resultado["insertar_producto"] = time.perf_counter() - inicio
+
+    buscados = [azar.choice(codigos) for _ in range(consultas)]
+    inicio = time.perf_counter()
+    for codigo in buscados:
+        lista.buscar_nodo(codigo)
+    resultado["buscar_nodo"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for codigo in buscados:
+        lista.ajustar_stock(codigo, azar.randint(-3, 3))
+    resultado["ajustar_stock"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for criterio in ("nombre", "precio", "categoria", "stock"):
+        lista.ordenar(criterio)
+    resultado["ordenar"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for nombre, categoria in (("cuaderno", ""), ("la", ""), ("", "pap"), ("regla 1", "regl")):
+        _filtrar(lista, nombre, categoria)
+    resultado["filtrar"] = time.perf_counter() - inicio
+    return resultado
+
+
+def ejecutar(tamanos, nombres, semilla):
+    fabricas = motores()
+    resultados = []
+    for n in tamanos:
+        catalogo = generar_catalogo(n, semilla)
+        for nombre in nombres:
+            medicion = medir(fabricas, nombre, catalogo, semilla)
+            resultados.append({"motor": nombre, "productos": n, **medicion})
+            print(f"  listo: {nombre} con {n} productos", flush=True)
+    return resultados
+
+
+# ------------------- REPORTE -------------------
+COLUMNAS = ["insertar_producto", "buscar_nodo", "ajustar_stock", "ordenar", "filtrar"]
+
+
+def tabla(resultados, anteriores=None):
+    """Tabla en texto; con resultados anteriores agrega cuántas veces más lento o rápido."""
+    previos = {(r["motor"], r["productos"]): r for r in anteriores or []}
+    lineas = [f"{'motor':<24}{'productos':>10}"
+              + "".join(f"{c:>19}" for c in COLUMNAS) + f"{'memoria MB':>12}"]
+    for r in resultados:
+        linea = f"{r['motor']:<24}{r['productos']:>10}"
+        previo = previos.get((r["motor"], r["productos"]))
+        for c in COLUMNAS:
+            celda = f"{r[c] * 1000:.1f}ms"
+            if previo and previo[c] > 0:
+                celda += f" x{r[c] / previo[c]:.2f}"
+            linea += f"{celda:>19}"
+        if r["memoria_pico"] is None:
+            linea += f"{'n/a':>12}"
+        else:
+            linea += f"{r['memoria_pico'] / 1024 ** 2:>12.1f}"
+        lineas.append(linea)
+    medidos_por_rss = sorted({r["motor"] for r in resultados} & MEDIR_POR_RSS)
+    if medidos_por_rss:
+        lineas.append(f"Memoria de {', '.join(medidos_por_rss)}: crecimiento de la memoria "
+                      "residente (n/a si el sistema no la informa)")
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de las operaciones de inventario")
+    parser.add_argument("--tamanos", default="1000,10000,100000",
+                        help="cantidades de productos separadas por coma (hasta 1000000)")
+    parser.add_argument("--motores", default=",".join(SCRIPTS + ["ListaColumnar", "ListaSQLite"]))
+    parser.add_argument("--semilla", type=int, default=2024)
+    parser.add_argument("--salida", default="benchmark_inventario.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para ver regresiones")
+    args = parser.parse_args()
+
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    resultados = ejecutar(tamanos, args.motores.split(","), args.semilla)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump({"semilla": args.semilla, "resultados": resultados}, f, indent=2)
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = json.load(f)["resultados"]
+    print(tabla(resultados, anteriores))
+    print(f"Resultados guardados en {args.salida}")
@@ -0,0 +1,366 @@
+from array import array
+import sys
+import tracemalloc
+
+from GestionUtiles import (ListaEnlazada, Nodo, VistaSoloLectura, CAMPOS_TEXTO, avisando,
+                           rango_recorriendo, top_k_recorriendo)
+
+SIN_CODIGO = -1      # Marca en la columna de códigos: fila libre
+CODIGO_TEXTO = -2    # Marca en la columna de códigos: el código no es numérico (va aparte)
+
+def _clave_codigo(codigo):
+    # Los códigos numéricos escritos sin ceros adelante ("125") se guardan como enteros;
+    # cualquier otro código se guarda tal cual (los que no son texto, dentro de una tupla
+    # para que 125 y "125" no se confundan)
+    if type(codigo) is str:
+        if (codigo.isascii() and codigo.isdigit() and len(codigo) <= 18
+                and (codigo[0] != "0" or codigo == "0")):
+            return int(codigo)
+        return codigo
+    return (codigo,)
+
+# ------------------- VISTA DE UNA FILA -------------------
+class FilaProducto(VistaSoloLectura):
+    # Vista de solo lectura de una fila del catálogo columnar (lo que devuelve buscar_nodo)
+    __slots__ = ("_lista", "_fila")
+
+    def __init__(self, lista, fila):
+        self._lista = lista
+        self._fila = fila
+
+    codigo = property(lambda self: self._lista._codigo(self._fila))
+    nombre = property(lambda self: self._lista._textos[self._lista._nombres[self._fila]])
+    categoria = property(lambda self: self._lista._textos[self._lista._categorias[self._fila]])
+    precio = property(lambda self: self._lista._precios[self._fila])
+    stock = property(lambda self: self._lista._stocks[self._fila])
+
+# ------------------- CLASE LISTA COLUMNAR -------------------
+class ListaColumnar:
+    # Guarda los mismos productos que ListaEnlazada, con los mismos métodos, pero en columnas:
+    # cada dato va en su propio arreglo compacto y un producto es solo un número de fila.
+    #  - los códigos numéricos como enteros en array('q'); los demás en un diccionario aparte
+    #  - precio y stock en array('d') y array('q')
+    #  - nombre y categoría como números que apuntan a una tabla de textos sin repetir;
+    #    un texto que ya no usa ninguna fila sale de la tabla y su número se reutiliza
+    #  - el orden de la lista se guarda en los arreglos _siguiente/_anterior (-1 = ninguno)
+    def __init__(self):
+        self._codigos = array("q")       # Código numérico de cada fila (o SIN_CODIGO / CODIGO_TEXTO)
+        self._codigos_texto = {}         # fila -> código, para los códigos que no son numéricos
+        self._nombres = array("q")       # Número del texto del nombre
+        self._categorias = array("q")    # Número del texto de la categoría
+        self._precios = array("d")
+        self._stocks = array("q")
+        self._siguiente = array("q")     # Fila siguiente en el orden de la lista
+        self._anterior = array("q")      # Fila anterior en el orden de la lista
+        self.cabeza = -1                 # Primera fila de la lista
+        self.cola = -1                   # Última fila de la lista
+        self._indice = {}                # clave del código (ver _clave_codigo) -> fila
+        self._libres = []                # Filas de productos eliminados, para reutilizarlas
+        self._textos = []                # Tabla de textos: número -> texto
+        self._textos_min = []            # Los mismos textos en minúsculas (para ordenar y filtrar)
+        self._ids_texto = {}             # texto -> número
+        self._usos = array("q")          # Cuántas filas usan cada texto
+        self._textos_libres = []         # Números de textos que ya nadie usa, para reutilizarlos
+
+    def __len__(self):
+        return len(self._indice)
+
+    # ---------- AUXILIARES ----------
+    def _id_texto(self, texto):
+        # Devuelve el número del texto, agregándolo a la tabla si es nuevo
+        # (y contando un uso más)
+        i = self._ids_texto.get(texto)
+        if i is None:
+            if self._textos_libres:
+                i = self._textos_libres.pop()
+                self._textos[i] = texto
+                self._textos_min[i] = texto.lower()
+            else:
+                i = len(self._textos)
+                self._textos.append(texto)
+                self._textos_min.append(texto.lower())
+                self._usos.append(0)
+            self._ids_texto[texto] = i
+        self._usos[i] += 1
+        return i
+
+    def _soltar_texto(self, i):
+        # Descuenta un uso del texto; si ya nadie lo usa, lo saca de la tabla
+        self._usos[i] -= 1
+        if self._usos[i] == 0:
+            del self._ids_texto[self._textos[i]]
+            self._textos[i] = self._textos_min[i] = None
+            self._textos_libres.append(i)
+
+    def _codigo(self, fila):
+        # Devuelve el código de la fila tal como se insertó
+        numero = self._codigos[fila]
+        return str(numero) if numero >= 0 else self._codigos_texto[fila]
+
+    def _nueva_fila(self, clave, codigo, nombre, categoria, precio, stock):
+        # Guarda los datos en una fila libre (o en una nueva al final de las columnas)
+        numero = clave if type(clave) is int else CODIGO_TEXTO
+        datos = (numero, self._id_texto(nombre), self._id_texto(categoria), precio, stock,
+                 -1, self.cola)
+        columnas = (self._codigos, self._nombres, self._categorias, self._precios, self._stocks,
+                    self._siguiente, self._anterior)
+        if self._libres:
+            fila = self._libres.pop()
+            for columna, valor in zip(columnas, datos):
+                columna[fila] = valor
+        else:
+            fila = len(self._codigos)
+            for columna, valor in zip(columnas, datos):
+                columna.append(valor)
+        if numero == CODIGO_TEXTO:
+            self._codigos_texto[fila] = codigo
+        # Se enlaza al final de la lista
+        if self.cola == -1:
+            self.cabeza = fila
+        else:
+            self._siguiente[self.cola] = fila
+        self.cola = fila
+        self._indice[clave] = fila
+        return fila
+
+    def _filas(self):
+        # Recorre las filas en el orden de la lista
+        fila = self.cabeza
+        while fila != -1:
+            yield fila
+            fila = self._siguiente[fila]
+
+    def _a_dict(self, fila):
+        return {
+            "codigo": self._codigo(fila),
+            "nombre": self._textos[self._nombres[fila]],
+            "categoria": self._textos[self._categorias[fila]],
+            "precio": self._precios[fila],
+            "stock": self._stocks[fila]
+        }
+
+    # ---------- CRUD ----------
+    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
+        """Agrega un producto al final. Devuelve False si el código ya existe."""
+        clave = _clave_codigo(codigo)
+        if clave in self._indice:
+            return False
+        self._nueva_fila(clave, codigo, nombre, categoria, precio, stock)
+        return True
+
+    def insertar_lote(self, filas):
+        """
+        Agrega muchos productos de una vez. Igual que en ListaEnlazada, devuelve
+        las filas rechazadas como tuplas (posición de la fila, código, motivo).
+        """
+        rechazadas = []
+        for i, fila in enumerate(filas):
+            if len(fila) != 5:
+                rechazadas.append((i, None, "Fila incompleta"))
+            elif (clave := _clave_codigo(fila[0])) in self._indice:
+                rechazadas.append((i, fila[0], "Código duplicado"))
+            else:
+                self._nueva_fila(clave, *fila)
+        return rechazadas
+
+    def buscar_nodo(self, codigo):
+        # Devuelve una FilaProducto de solo lectura, o None si el código no existe
+        fila = self._indice.get(_clave_codigo(codigo))
+        return None if fila is None else FilaProducto(self, fila)
+
+    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
+        fila = self._indice.get(_clave_codigo(codigo))
+        if fila is None:
+            return False
+        if nombre is not None:
+            anterior = self._nombres[fila]
+            self._nombres[fila] = self._id_texto(nombre)
+            self._soltar_texto(anterior)
+        if categoria is not None:
+            anterior = self._categorias[fila]
+            self._categorias[fila] = self._id_texto(categoria)
+            self._soltar_texto(anterior)
+        if precio is not None:
+            self._precios[fila] = precio
+        if stock is not None:
+            self._stocks[fila] = stock
+        return True
+
+    def eliminar_producto(self, codigo):
+        fila = self._indice.pop(_clave_codigo(codigo), None)
+        if fila is None:
+            return False
+        anterior, siguiente = self._anterior[fila], self._siguiente[fila]
+        if anterior != -1:
+            self._siguiente[anterior] = siguiente
+        else:
+            self.cabeza = siguiente
+        if siguiente != -1:
+            self._anterior[siguiente] = anterior
+        else:
+            self.cola = anterior
+        if self._codigos[fila] == CODIGO_TEXTO:
+            del self._codigos_texto[fila]
+        self._codigos[fila] = SIN_CODIGO
+        self._soltar_texto(self._nombres[fila])
+        self._soltar_texto(self._categorias[fila])
+        self._libres.append(fila)
+        return True
+
+    # ---------- INVENTARIO ----------
+    def ajustar_stock(self, codigo, cantidad):
+        """Suma (entrada) o resta (salida) stock; nunca lo deja negativo."""
+        fila = self._indice.get(_clave_codigo(codigo))
+        if fila is None or self._stocks[fila] + cantidad < 0:
+            return False
+        self._stocks[fila] += cantidad
+        return True
+
+    def ajustar_stock_lote(self, movimientos):
+        """
+        Igual que en ListaEnlazada: se aplican todos los cambios (codigo, cantidad) o ninguno.
+        Devuelve las líneas que fallan como (posición de la línea, código, motivo).
+        """
+        fallas, totales = [], {}   # fila -> suma de sus cantidades
+        for i, (codigo, cantidad) in enumerate(movimientos):
+            fila = self._indice.get(_clave_codigo(codigo))
+            if fila is None:
+                fallas.append((i, codigo, "Producto no encontrado"))
+                continue
+            total = totales.get(fila, 0) + cantidad
+            if self._stocks[fila] + total < 0:
+                fallas.append((i, codigo, "Stock insuficiente"))
+                continue
+            totales[fila] = total
+        if not fallas:
+            for fila, total in totales.items():
+                self._stocks[fila] += total
+        return fallas
+
+    # ---------- CONSULTAS ----------
+    def _to_list(self):
+        return [self._a_dict(fila) for fila in self._filas()]
+
+    def recorrer(self):
+        for fila in self._filas():
+            yield FilaProducto(self, fila)
+
+    def recorrer_ordenado(self, criterio):
+        for fila in self._filas_ordenadas(criterio):
+            yield FilaProducto(self, fila)
+
+    def recorrer_filtrado(self, nombre_substr="", categoria="", codigo_substr="", progreso=None):
+        for fila in self._filas_filtradas(nombre_substr, categoria, codigo_substr, progreso):
+            yield FilaProducto(self, fila)
+
+    def ordenar(self, criterio):
+        return [self._a_dict(fila) for fila in self._filas_ordenadas(criterio)]
+
+    def filtrar(self, nombre_substr="", categoria="", codigo_substr=""):
+        return [self._a_dict(fila) for fila in self._filas_filtradas(nombre_substr, categoria, codigo_substr)]
+
+    def rango(self, campo, minimo=None, maximo=None):
+        return [self._a_dict(fila) for fila in self._filas_rango(campo, minimo, maximo)]
+
+    def recorrer_rango(self, campo, minimo=None, maximo=None, progreso=None):
+        for fila in self._filas_rango(campo, minimo, maximo, progreso):
+            yield FilaProducto(self, fila)
+
+    def top_k(self, criterio, k, ascendente=True, categoria=None):
+        return [self._a_dict(fila) for fila in self._filas_top_k(criterio, k, ascendente, categoria)]
+
+    def _claves(self):
+        # Clave de orden de una fila según cada criterio
+        return {
+            "nombre": lambda f: self._textos_min[self._nombres[f]],
+            "precio": self._precios.__getitem__,
+            "categoria": lambda f: self._textos_min[self._categorias[f]],
+            "stock": self._stocks.__getitem__,
+        }
+
+    def _filas_ordenadas(self, criterio):
+        # Ordena números de fila (no diccionarios); sort es estable, así que los empates
+        # quedan en el orden de la lista, igual que en ListaEnlazada
+        claves = self._claves()
+        filas = list(self._filas())
+        if criterio in claves:
+            filas.sort(key=claves[criterio])
+        return filas
+
+    def _filas_rango(self, campo, minimo, maximo, progreso=None):
+        # Sin índices de orden: se revisan todas las filas (KeyError si el campo no se ordena)
+        return rango_recorriendo(self._filas_revisadas(progreso), self._claves()[campo],
+                                 campo in CAMPOS_TEXTO, minimo, maximo)
+
+    def _filas_revisadas(self, progreso):
+        # Todas las filas; con `progreso`, avisando cuántas lleva
+        return self._filas() if progreso is None else avisando(self._filas(), progreso)
+
+    def _filas_top_k(self, criterio, k, ascendente, categoria):
+        filas = self._filas()
+        if categoria is not None:   # La categoría se compara por número de texto
+            buscada = categoria.lower()
+            ids = {i for i, t in enumerate(self._textos_min) if t is not None and t == buscada}
+            filas = (f for f in filas if self._categorias[f] in ids)
+        return top_k_recorriendo(filas, self._claves().get(criterio), k, ascendente)
+
+    def _filas_filtradas(self, nombre_substr, categoria, codigo_substr, progreso=None):
+        # Cada texto distinto se revisa una sola vez en la tabla de textos (los huecos
+        # de textos libres se saltan); después basta con comparar números fila por fila
+        nombre_substr, categoria = nombre_substr.lower(), categoria.lower()
+        codigo_substr = codigo_substr.lower()
+        nombres_ok = {i for i, t in enumerate(self._textos_min) if t is not None and nombre_substr in t}
+        categorias_ok = {i for i, t in enumerate(self._textos_min) if t is not None and categoria in t}
+        return (
+            fila for fila in self._filas_revisadas(progreso)
+            if self._nombres[fila] in nombres_ok
+            and self._categorias[fila] in categorias_ok
+            and (not codigo_substr or codigo_substr in str(self._codigo(fila)).lower())
+        )
+
+
+# ------------------- PRUEBA DE MEMORIA -------------------
+class CadenaNodos:
+    # Punto de comparación: solo los Nodo enlazados uno tras otro, como la lista original,
+    # sin el índice por código ni los índices de orden, texto y parecidos de ListaEnlazada
+    def __init__(self):
+        self.cabeza = None
+        self.cola = None
+
+    def insertar_lote(self, filas):
+        for fila in filas:
+            nodo = Nodo(*fila)
+            if self.cola is None:
+                self.cabeza = nodo
+            else:
+                self.cola.siguiente = nodo
+                nodo.anterior = self.cola
+            self.cola = nodo
+        return []
+
+
+def medir_memoria(clase, n):
+    """Carga n productos sintéticos y devuelve los bytes que ocupa la estructura."""
+    categorias = ["Cuadernos", "Lápices", "Borradores", "Reglas", "Mochilas", "Colores"]
+    tracemalloc.start()
+    lista = clase()
+    lista.insertar_lote(
+        (str(i), f"Producto {i % 5000}", categorias[i % len(categorias)], (i % 1000) / 10, i % 300)
+        for i in range(n)
+    )
+    usada, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del lista
+    return usada
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"Memoria con {n} productos:")
+    resultados = {}
+    for clase in (CadenaNodos, ListaEnlazada, ListaColumnar):
+        resultados[clase.__name__] = medir_memoria(clase, n)
+        print(f"  {clase.__name__:<14} {resultados[clase.__name__] / 1024 ** 2:8.1f} MB")
+    # El ahorro se mide contra la cadena de Nodo sola; ListaEnlazada suma además sus índices
+    print(f"  Ahorro frente a la cadena de Nodo: "
+          f"{resultados['CadenaNodos'] / resultados['ListaColumnar']:.1f} veces menos memoria")
@@ -0,0 +1,357 @@
+import mmap
+import os
+import struct
+
+from GestionUtiles import (ListaEnlazada, Nodo, VistaProducto, VistaSoloLectura, CLAVES_ORDEN,
+                           CAMPOS_TEXTO, avisando, rango_recorriendo, top_k_recorriendo)
+
+# ------------------- FORMATO DEL ARCHIVO DE CATÁLOGO -------------------
+# Cabecera "<4sIQQQ": MAGIA, versión, cantidad de productos, posición de la tabla de orden,
+#                     posición del montón de textos.
+# Tabla de registros (desde el byte 32), ordenada por código para poder buscar por bisección.
+#   Cada registro "<QHHHxxdq": posición de sus textos en el montón, largo del código, del nombre
+#   y de la categoría (los tres textos van seguidos), precio y stock. 32 bytes por producto.
+# Tabla de orden: "<I" por producto, con el número de registro en el orden de la lista.
+# Montón de textos: todos los textos en utf-8, uno detrás de otro.
+MAGIA = b"CAT1"
+VERSION = 1
+CABECERA = struct.Struct("<4sIQQQ")
+REGISTRO = struct.Struct("<QHHHxxdq")
+_ORDEN = struct.Struct("<I")
+
+
+def escribir_catalogo(ruta, productos):
+    """
+    Guarda los productos (tuplas codigo, nombre, categoria, precio, stock, en el orden
+    de la lista) en un archivo de catálogo. Se escribe aparte y se reemplaza al final.
+    """
+    productos = [(str(c).encode("utf-8"), n.encode("utf-8"), cat.encode("utf-8"), p, s)
+                 for c, n, cat, p, s in productos]
+    por_codigo = sorted(range(len(productos)), key=lambda i: productos[i][0])
+    posicion_registro = [0] * len(productos)   # Número de registro de cada producto
+    registros, textos, pos_texto = [], [], 0
+    for r, i in enumerate(por_codigo):
+        codigo, nombre, categoria, precio, stock = productos[i]
+        posicion_registro[i] = r
+        registros.append(REGISTRO.pack(pos_texto, len(codigo), len(nombre), len(categoria),
+                                       precio, stock))
+        textos += (codigo, nombre, categoria)
+        pos_texto += len(codigo) + len(nombre) + len(categoria)
+
+    pos_orden = CABECERA.size + REGISTRO.size * len(productos)
+    pos_textos = pos_orden + _ORDEN.size * len(productos)
+    with open(ruta + ".tmp", "wb") as f:
+        f.write(CABECERA.pack(MAGIA, VERSION, len(productos), pos_orden, pos_textos))
+        f.write(b"".join(registros))
+        f.write(b"".join(_ORDEN.pack(r) for r in posicion_registro))
+        f.write(b"".join(textos))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta + ".tmp", ruta)
+
+
+# ------------------- VISTA DE UN REGISTRO DEL ARCHIVO -------------------
+class RegistroMapeado(VistaSoloLectura):
+    # Vista de solo lectura de un producto guardado en el archivo; lee los bytes al pedirlos
+    __slots__ = ("_catalogo", "_registro")
+
+    def __init__(self, catalogo, registro):
+        self._catalogo = catalogo
+        self._registro = registro
+
+    def _textos(self):
+        return self._catalogo._textos_de(self._registro)
+
+    codigo = property(lambda self: self._textos()[0])
+    nombre = property(lambda self: self._textos()[1])
+    categoria = property(lambda self: self._textos()[2])
+    precio = property(lambda self: self._catalogo._numeros_de(self._registro)[0])
+    stock = property(lambda self: self._catalogo._numeros_de(self._registro)[1])
+
+    def a_dict(self):
+        # Lee cada parte del registro una sola vez (no una por campo)
+        codigo, nombre, categoria = self._textos()
+        precio, stock = self._catalogo._numeros_de(self._registro)
+        return {"codigo": codigo, "nombre": nombre, "categoria": categoria,
+                "precio": precio, "stock": stock}
+
+
+# ------------------- CLASE CATÁLOGO MAPEADO -------------------
+class CatalogoMapeado:
+    """
+    Abre un archivo de catálogo con mmap, con los mismos métodos que ListaEnlazada.
+
+    Abrirlo solo lee la cabecera: el sistema operativo trae del disco únicamente las
+    páginas que se van tocando. buscar_nodo busca el código por bisección dentro del
+    archivo, sin cargarlo. Los cambios no tocan el archivo: los productos nuevos van a
+    una ListaEnlazada aparte, los del archivo que se modifican se copian a un Nodo y
+    los eliminados se anotan. guardar() escribe todo en un archivo nuevo.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._abrir()
+
+    def _abrir(self):
+        self._archivo = open(self.ruta, "rb")
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, version, self._cantidad, self._pos_orden, self._pos_textos = \
+            CABECERA.unpack_from(self._mapa, 0)
+        if magia != MAGIA or version != VERSION:
+            raise ValueError(f"{self.ruta} no es un archivo de catálogo válido")
+        self._nuevos = ListaEnlazada()   # Productos agregados después de abrir
+        self._modificados = {}           # código -> Nodo con la copia modificada
+        self._borrados = set()           # Códigos del archivo que se eliminaron
+
+    def cerrar(self):
+        self._soltar()
+
+    def _soltar(self):
+        self._mapa.close()
+        self._archivo.close()
+
+    def __len__(self):
+        return self._cantidad - len(self._borrados) + len(self._nuevos)
+
+    def _sin_cambios(self):
+        return not (self._nuevos or self._modificados or self._borrados)
+
+    # ---------- LECTURA DEL ARCHIVO ----------
+    def _textos_de(self, registro):
+        pos, l_codigo, l_nombre, l_categoria, _, _ = \
+            REGISTRO.unpack_from(self._mapa, CABECERA.size + REGISTRO.size * registro)
+        pos += self._pos_textos
+        fin_codigo, fin_nombre = pos + l_codigo, pos + l_codigo + l_nombre
+        return (self._mapa[pos:fin_codigo].decode("utf-8"),
+                self._mapa[fin_codigo:fin_nombre].decode("utf-8"),
+                self._mapa[fin_nombre:fin_nombre + l_categoria].decode("utf-8"))
+
+    def _numeros_de(self, registro):
+        return REGISTRO.unpack_from(self._mapa, CABECERA.size + REGISTRO.size * registro)[4:]
+
+    def _codigo_en(self, registro):
+        pos, l_codigo = REGISTRO.unpack_from(self._mapa, CABECERA.size + REGISTRO.size * registro)[:2]
+        pos += self._pos_textos
+        return self._mapa[pos:pos + l_codigo]
+
+    def _buscar_registro(self, codigo):
+        # Bisección sobre la tabla ordenada por código; solo lee unas 20-25 entradas
+        buscado = str(codigo).encode("utf-8")
+        bajo, alto = 0, self._cantidad
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._codigo_en(medio) < buscado:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo < self._cantidad and self._codigo_en(bajo) == buscado:
+            return bajo
+        return None
+
+    def _en_archivo(self, codigo):
+        # Número de registro de un producto del archivo que sigue vigente, o None
+        if codigo in self._borrados:
+            return None
+        return self._buscar_registro(codigo)
+
+    def _copiar(self, codigo):
+        # Copia a memoria (una sola vez) un producto del archivo que se va a modificar
+        nodo = self._modificados.get(codigo)
+        if nodo is None:
+            registro = self._en_archivo(codigo)
+            if registro is None:
+                return None
+            nodo = Nodo(*self._textos_de(registro), *self._numeros_de(registro))
+            self._modificados[codigo] = nodo
+        return nodo
+
+    # ---------- CRUD ----------
+    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
+        if self.buscar_nodo(codigo) is not None:
+            return False
+        return self._nuevos.insertar_producto(codigo, nombre, categoria, precio, stock)
+
+    def insertar_lote(self, filas):
+        rechazadas, pendientes, posiciones = [], [], []
+        for i, fila in enumerate(filas):
+            if len(fila) == 5 and self._en_archivo(fila[0]) is not None:
+                rechazadas.append((i, fila[0], "Código duplicado"))
+            else:
+                pendientes.append(fila)
+                posiciones.append(i)
+        # La lista de nuevos numera sus filas desde 0: se traducen a la posición original
+        for j, codigo, motivo in self._nuevos.insertar_lote(pendientes):
+            rechazadas.append((posiciones[j], codigo, motivo))
+        return sorted(rechazadas, key=lambda r: r[0])
+
+    def buscar_nodo(self, codigo):
+        # Devuelve el Nodo si está en memoria, o un RegistroMapeado de solo lectura
+        nodo = self._nuevos.buscar_nodo(codigo) or self._modificados.get(codigo)
+        if nodo is not None:
+            return nodo
+        registro = self._en_archivo(codigo)
+        return None if registro is None else RegistroMapeado(self, registro)
+
+    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
+        if self._nuevos.buscar_nodo(codigo):
+            return self._nuevos.actualizar_producto(codigo, nombre, categoria, precio, stock)
+        nodo = self._copiar(codigo)
+        if nodo is None:
+            return False
+        if nombre is not None:
+            nodo.nombre = nombre
+        if categoria is not None:
+            nodo.categoria = categoria
+        if precio is not None:
+            nodo.precio = precio
+        if stock is not None:
+            nodo.stock = stock
+        return True
+
+    def eliminar_producto(self, codigo):
+        if self._nuevos.eliminar_producto(codigo):
+            return True
+        if self._en_archivo(codigo) is None:
+            return False
+        self._borrados.add(codigo)
+        self._modificados.pop(codigo, None)
+        return True
+
+    def ajustar_stock(self, codigo, cantidad):
+        if self._nuevos.buscar_nodo(codigo):
+            return self._nuevos.ajustar_stock(codigo, cantidad)
+        nodo = self._modificados.get(codigo)
+        if nodo is None:
+            registro = self._en_archivo(codigo)
+            if registro is None or self._numeros_de(registro)[1] + cantidad < 0:
+                return False
+            nodo = self._copiar(codigo)
+        if nodo.stock + cantidad < 0:
+            return False
+        nodo.stock += cantidad
+        return True
+
+    def ajustar_stock_lote(self, movimientos):
+        """
+        Igual que en ListaEnlazada: se aplican todos los cambios (codigo, cantidad) o ninguno.
+        Devuelve las líneas que fallan como (posición de la línea, código, motivo).
+        """
+        fallas, stocks, totales = [], {}, {}   # Por código: stock actual y suma de cantidades
+        for i, (codigo, cantidad) in enumerate(movimientos):
+            if codigo not in stocks:
+                producto = self.buscar_nodo(codigo)
+                if producto is None:
+                    fallas.append((i, codigo, "Producto no encontrado"))
+                    continue
+                stocks[codigo] = producto.stock
+            total = totales.get(codigo, 0) + cantidad
+            if stocks[codigo] + total < 0:
+                fallas.append((i, codigo, "Stock insuficiente"))
+                continue
+            totales[codigo] = total
+        if not fallas:
+            for codigo, total in totales.items():
+                if total:
+                    self.ajustar_stock(codigo, total)   # Ya revisado: no puede fallar
+        return fallas
+
+    # ---------- RECORRIDOS Y CONSULTAS ----------
+    def _elementos(self):
+        # Productos en el orden de la lista: primero los del archivo, luego los nuevos.
+        # Entrega Nodo para los que están en memoria y RegistroMapeado para el resto.
+        for i in range(self._cantidad):
+            (registro,) = _ORDEN.unpack_from(self._mapa, self._pos_orden + _ORDEN.size * i)
+            if self._borrados or self._modificados:
+                codigo = self._codigo_en(registro).decode("utf-8")
+                if codigo in self._borrados:
+                    continue
+                if codigo in self._modificados:
+                    yield self._modificados[codigo]
+                    continue
+            yield RegistroMapeado(self, registro)
+        yield from self._nuevos._nodos()
+
+    @staticmethod
+    def _vista(elemento):
+        return elemento if isinstance(elemento, RegistroMapeado) else VistaProducto(elemento)
+
+    @staticmethod
+    def _a_dict(elemento):
+        if isinstance(elemento, RegistroMapeado):
+            return elemento.a_dict()
+        return ListaEnlazada._a_dict(elemento)
+
+    def _ordenados(self, criterio):
+        if criterio not in CLAVES_ORDEN:
+            return self._elementos()
+        return sorted(self._elementos(), key=CLAVES_ORDEN[criterio])
+
+    def _rango(self, campo, minimo, maximo, progreso=None):
+        return rango_recorriendo(self._revisados(progreso), CLAVES_ORDEN[campo],
+                                 campo in CAMPOS_TEXTO, minimo, maximo)
+
+    def _revisados(self, progreso):
+        # Todos los productos; con `progreso`, avisando cuántos lleva
+        return self._elementos() if progreso is None else avisando(self._elementos(), progreso)
+
+    def _top_k(self, criterio, k, ascendente, categoria):
+        elementos = self._elementos()
+        if categoria is not None:
+            buscada = categoria.lower()
+            elementos = (e for e in elementos if e.categoria.lower() == buscada)
+        return top_k_recorriendo(elementos, CLAVES_ORDEN.get(criterio), k, ascendente)
+
+    def _filtrados(self, nombre_substr, categoria, codigo_substr, progreso=None):
+        buscados = {"nombre": nombre_substr.lower(), "categoria": categoria.lower(),
+                    "codigo": codigo_substr.lower()}
+        buscados = {campo: texto for campo, texto in buscados.items() if texto}
+        return (e for e in self._revisados(progreso)
+                if all(texto in CAMPOS_TEXTO[campo](e) for campo, texto in buscados.items()))
+
+    def _to_list(self):
+        return [self._a_dict(e) for e in self._elementos()]
+
+    def recorrer(self):
+        return map(self._vista, self._elementos())
+
+    def recorrer_ordenado(self, criterio):
+        return map(self._vista, self._ordenados(criterio))
+
+    def recorrer_filtrado(self, nombre_substr="", categoria="", codigo_substr="", progreso=None):
+        return map(self._vista, self._filtrados(nombre_substr, categoria, codigo_substr, progreso))
+
+    def ordenar(self, criterio):
+        return [self._a_dict(e) for e in self._ordenados(criterio)]
+
+    def filtrar(self, nombre_substr="", categoria="", codigo_substr=""):
+        return [self._a_dict(e) for e in self._filtrados(nombre_substr, categoria, codigo_substr)]
+
+    def rango(self, campo, minimo=None, maximo=None):
+        return [self._a_dict(e) for e in self._rango(campo, minimo, maximo)]
+
+    def recorrer_rango(self, campo, minimo=None, maximo=None, progreso=None):
+        return map(self._vista, self._rango(campo, minimo, maximo, progreso))
+
+    def top_k(self, criterio, k, ascendente=True, categoria=None):
+        return [self._a_dict(e) for e in self._top_k(criterio, k, ascendente, categoria)]
+
+    def guardar(self, ruta=None):
+        """
+        Escribe el catálogo con todos los cambios (por defecto, sobre el mismo archivo).
+        Sobre el mismo archivo, sin cambios no escribe nada; con cambios lee todo a memoria,
+        suelta el mmap (Windows no deja reemplazar un archivo mapeado), lo reemplaza y lo
+        vuelve a abrir con los cambios ya incluidos.
+        """
+        if ruta is not None and os.path.abspath(ruta) != os.path.abspath(self.ruta):
+            escribir_catalogo(ruta, self._filas())
+            return
+        if self._sin_cambios():
+            return
+        filas = list(self._filas())
+        self._soltar()
+        escribir_catalogo(self.ruta, filas)
+        self._abrir()
+
+    def _filas(self):
+        return ((p["codigo"], p["nombre"], p["categoria"], p["precio"], p["stock"])
+                for p in self._to_list())
@@ -0,0 +1,299 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from GestionUtiles import Nodo, VistaProducto, TareaCancelada, avisando
+
+# ------------------- ESQUEMA -------------------
+# "orden" numera los productos según llegan: es el orden de la lista y desempata al ordenar.
+# Las columnas *_min guardan los textos en minúsculas (con str.lower de Python, igual que
+# ListaEnlazada) para ordenar y filtrar sin distinguir mayúsculas usando índices.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    orden         INTEGER PRIMARY KEY AUTOINCREMENT,
+    codigo        TEXT NOT NULL UNIQUE,
+    nombre        TEXT NOT NULL,
+    categoria     TEXT NOT NULL,
+    precio        REAL NOT NULL,
+    stock         INTEGER NOT NULL,
+    codigo_min    TEXT NOT NULL,
+    nombre_min    TEXT NOT NULL,
+    categoria_min TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS productos_nombre ON productos (nombre_min, orden);
+CREATE INDEX IF NOT EXISTS productos_categoria ON productos (categoria_min, orden);
+CREATE INDEX IF NOT EXISTS productos_precio ON productos (precio, orden);
+CREATE INDEX IF NOT EXISTS productos_stock ON productos (stock, orden);
+"""
+
+# Índice de trigramas (FTS5) para filtrar por subcadenas; se mantiene con disparadores.
+ESQUEMA_BUSQUEDA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS busqueda USING fts5 (
+    codigo_min, nombre_min, categoria_min,
+    content='productos', content_rowid='orden', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS productos_ai AFTER INSERT ON productos BEGIN
+    INSERT INTO busqueda (rowid, codigo_min, nombre_min, categoria_min)
+    VALUES (new.orden, new.codigo_min, new.nombre_min, new.categoria_min);
+END;
+CREATE TRIGGER IF NOT EXISTS productos_ad AFTER DELETE ON productos BEGIN
+    INSERT INTO busqueda (busqueda, rowid, codigo_min, nombre_min, categoria_min)
+    VALUES ('delete', old.orden, old.codigo_min, old.nombre_min, old.categoria_min);
+END;
+CREATE TRIGGER IF NOT EXISTS productos_au AFTER UPDATE OF nombre_min, categoria_min ON productos BEGIN
+    INSERT INTO busqueda (busqueda, rowid, codigo_min, nombre_min, categoria_min)
+    VALUES ('delete', old.orden, old.codigo_min, old.nombre_min, old.categoria_min);
+    INSERT INTO busqueda (rowid, codigo_min, nombre_min, categoria_min)
+    VALUES (new.orden, new.codigo_min, new.nombre_min, new.categoria_min);
+END;
+"""
+
+# Consultas fijas: sqlite3 las prepara una vez y reutiliza el plan en cada llamada
+COLUMNAS = "codigo, nombre, categoria, precio, stock"
+SQL_INSERTAR = ("INSERT OR IGNORE INTO productos (codigo, nombre, categoria, precio, stock, "
+                "codigo_min, nombre_min, categoria_min) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_BUSCAR = f"SELECT {COLUMNAS} FROM productos WHERE codigo = ?"
+SQL_ELIMINAR = "DELETE FROM productos WHERE codigo = ?"
+SQL_AJUSTAR = "UPDATE productos SET stock = stock + ? WHERE codigo = ? AND stock + ? >= 0"
+SQL_TODOS = f"SELECT {COLUMNAS} FROM productos ORDER BY orden"
+SQL_RESUMEN = ("SELECT min(categoria) AS categoria, count(*) AS productos, sum(stock) AS unidades, "
+               "round(sum(precio * stock), 2) AS valor FROM productos "
+               "GROUP BY categoria_min ORDER BY categoria_min")
+COLUMNA_ORDEN = {"nombre": "nombre_min", "precio": "precio",
+                 "categoria": "categoria_min", "stock": "stock"}
+SQL_ORDENAR = {
+    "nombre": f"SELECT {COLUMNAS} FROM productos ORDER BY nombre_min, orden",
+    "precio": f"SELECT {COLUMNAS} FROM productos ORDER BY precio, orden",
+    "categoria": f"SELECT {COLUMNAS} FROM productos ORDER BY categoria_min, orden",
+    "stock": f"SELECT {COLUMNAS} FROM productos ORDER BY stock, orden",
+}
+
+
+# ------------------- CLASE LISTA SQLITE -------------------
+class ListaSQLite:
+    """
+    Guarda los productos en un archivo SQLite, con los mismos métodos que ListaEnlazada,
+    para manejar catálogos que no caben en memoria.
+
+    ordenar y filtrar se resuelven dentro de SQLite con los índices; los resultados
+    se leen fila por fila. Cada operación suelta se confirma sola; para agrupar muchas
+    escrituras en una transacción se usa `with lista.transaccion(): ...`
+    (insertar_lote ya lo hace).
+
+    Cada hilo usa su propia conexión al archivo (la App filtra, importa y exporta desde
+    un hilo aparte); con WAL, los que leen no esperan al que escribe.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()   # Conexión y transacción abierta de cada hilo
+        self._conexiones = []             # Todas las conexiones abiertas, para cerrarlas
+        self._candado = threading.Lock()
+        self._con.execute("PRAGMA journal_mode = WAL")
+        self._con.executescript(ESQUEMA)
+        existia = self._con.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'busqueda'").fetchone() is not None
+        try:
+            self._con.executescript(ESQUEMA_BUSQUEDA)
+            if not existia:   # Índice recién creado: se llena con los productos que ya hubiera
+                self._con.execute("INSERT INTO busqueda (busqueda) VALUES ('rebuild')")
+            self._trigramas = True
+        except sqlite3.OperationalError:   # SQLite sin FTS5/trigram: se filtra sin índice
+            self._trigramas = False
+
+    @property
+    def _con(self):
+        # La conexión del hilo que llama; se abre la primera vez que ese hilo la usa
+        con = getattr(self._local, "con", None)
+        if con is None:
+            # check_same_thread=False solo para que cerrar() pueda cerrarla desde otro hilo
+            con = sqlite3.connect(self.ruta, isolation_level=None, cached_statements=64,
+                                  check_same_thread=False)
+            con.row_factory = sqlite3.Row   # Filas que se leen como fila["nombre"]
+            con.execute("PRAGMA synchronous = NORMAL")   # Seguro en WAL y mucho más rápido
+            with self._candado:
+                self._conexiones.append(con)
+            self._local.con = con
+        return con
+
+    def cerrar(self):
+        with self._candado:
+            for con in self._conexiones:
+                con.close()
+            self._conexiones.clear()
+
+    def __len__(self):
+        return self._con.execute("SELECT count(*) FROM productos").fetchone()[0]
+
+    @contextmanager
+    def transaccion(self):
+        """Agrupa varias escrituras: se confirman todas juntas o ninguna."""
+        if getattr(self._local, "en_transaccion", False):   # Ya hay una abierta: se usa la misma
+            yield
+            return
+        self._con.execute("BEGIN")
+        self._local.en_transaccion = True
+        try:
+            yield
+        except BaseException:
+            self._con.execute("ROLLBACK")
+            raise
+        else:
+            self._con.execute("COMMIT")
+        finally:
+            self._local.en_transaccion = False
+
+    # ---------- CRUD ----------
+    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
+        cursor = self._con.execute(SQL_INSERTAR, (codigo, nombre, categoria, precio, stock,
+                                                  str(codigo).lower(), nombre.lower(),
+                                                  categoria.lower()))
+        return cursor.rowcount == 1   # 0 si el código ya existía
+
+    def insertar_lote(self, filas):
+        """Inserta todas las filas en una sola transacción; devuelve las rechazadas."""
+        rechazadas = []
+        with self.transaccion():
+            for i, fila in enumerate(filas):
+                if len(fila) != 5:
+                    rechazadas.append((i, None, "Fila incompleta"))
+                elif not self.insertar_producto(*fila):
+                    rechazadas.append((i, fila[0], "Código duplicado"))
+        return rechazadas
+
+    def buscar_nodo(self, codigo):
+        # Devuelve una vista de solo lectura del producto (copiado de la base), o None
+        fila = self._con.execute(SQL_BUSCAR, (codigo,)).fetchone()
+        return None if fila is None else VistaProducto(Nodo(*fila))
+
+    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
+        cambios = {}
+        if nombre is not None:
+            cambios.update(nombre=nombre, nombre_min=nombre.lower())
+        if categoria is not None:
+            cambios.update(categoria=categoria, categoria_min=categoria.lower())
+        if precio is not None:
+            cambios["precio"] = precio
+        if stock is not None:
+            cambios["stock"] = stock
+        if not cambios:
+            return self._con.execute(SQL_BUSCAR, (codigo,)).fetchone() is not None
+        asignaciones = ", ".join(f"{columna} = ?" for columna in cambios)
+        cursor = self._con.execute(f"UPDATE productos SET {asignaciones} WHERE codigo = ?",
+                                   (*cambios.values(), codigo))
+        return cursor.rowcount == 1
+
+    def eliminar_producto(self, codigo):
+        return self._con.execute(SQL_ELIMINAR, (codigo,)).rowcount == 1
+
+    def ajustar_stock(self, codigo, cantidad):
+        # La condición va en el mismo UPDATE: el stock nunca queda negativo
+        return self._con.execute(SQL_AJUSTAR, (cantidad, codigo, cantidad)).rowcount == 1
+
+    def ajustar_stock_lote(self, movimientos):
+        """
+        Igual que en ListaEnlazada: se aplican todos los cambios (codigo, cantidad) o ninguno.
+        Cada línea es un UPDATE con la misma condición que ajustar_stock, dentro de un
+        SAVEPOINT (sirve también dentro de una transacción abierta) que se deshace si
+        alguna línea falla. Devuelve las líneas que fallan como (posición, código, motivo).
+        """
+        con, fallas = self._con, []
+        con.execute("SAVEPOINT ajuste_lote")
+        try:
+            for i, (codigo, cantidad) in enumerate(movimientos):
+                if con.execute(SQL_AJUSTAR, (cantidad, codigo, cantidad)).rowcount != 1:
+                    existe = con.execute(SQL_BUSCAR, (codigo,)).fetchone() is not None
+                    motivo = "Stock insuficiente" if existe else "Producto no encontrado"
+                    fallas.append((i, codigo, motivo))
+            if fallas:
+                con.execute("ROLLBACK TO ajuste_lote")
+        except BaseException:
+            con.execute("ROLLBACK TO ajuste_lote")
+            raise
+        finally:
+            con.execute("RELEASE ajuste_lote")
+        return fallas
+
+    # ---------- CONSULTAS ----------
+    def recorrer(self):
+        return self._con.execute(SQL_TODOS)
+
+    def recorrer_ordenado(self, criterio):
+        return self._con.execute(SQL_ORDENAR.get(criterio, SQL_TODOS))
+
+    def recorrer_filtrado(self, nombre_substr="", categoria="", codigo_substr="", progreso=None):
+        buscados = {"nombre_min": nombre_substr.lower(), "categoria_min": categoria.lower(),
+                    "codigo_min": codigo_substr.lower()}
+        condiciones, parametros = [], []
+        for columna, texto in buscados.items():
+            if not texto:
+                continue
+            if self._trigramas and len(texto) >= 3:
+                # El índice de trigramas da los candidatos; instr confirma igual que Python
+                condiciones.append("orden IN (SELECT rowid FROM busqueda WHERE busqueda MATCH ?)")
+                parametros.append(f'{columna} : "{texto.replace(chr(34), chr(34) * 2)}"')
+            condiciones.append(f"instr({columna}, ?) > 0")
+            parametros.append(texto)
+        donde = " AND ".join(condiciones) or "1"
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM productos WHERE {donde} ORDER BY orden", parametros, progreso)
+
+    def _to_list(self):
+        return [dict(fila) for fila in self.recorrer()]
+
+    def recorrer_rango(self, campo, minimo=None, maximo=None, progreso=None):
+        # Usa el índice (columna, orden): SQLite solo lee las filas del rango
+        columna = COLUMNA_ORDEN[campo]
+        condiciones, parametros = [], []
+        for limite, operador in ((minimo, ">="), (maximo, "<=")):
+            if limite is not None:
+                condiciones.append(f"{columna} {operador} ?")
+                parametros.append(limite.lower() if isinstance(limite, str) else limite)
+        donde = " AND ".join(condiciones) or "1"
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM productos WHERE {donde} ORDER BY {columna}, orden",
+            parametros, progreso)
+
+    def _consultar(self, sql, parametros, progreso):
+        # Sin `progreso`, el cursor tal cual. Con él (en segundo plano), las filas que se
+        # entregan avisan su avance, y mientras SQLite revisa filas por su cuenta se le
+        # pregunta cada tanto si se canceló la tarea
+        if progreso is None:
+            return self._con.execute(sql, parametros)
+        return self._consultar_avisando(sql, parametros, progreso)
+
+    def _consultar_avisando(self, sql, parametros, progreso):
+        con = self._con
+        con.set_progress_handler(lambda: progreso.cancelado, 10_000)
+        try:
+            yield from avisando(con.execute(sql, parametros), progreso)
+        except sqlite3.OperationalError:
+            if progreso.cancelado:   # La consulta se interrumpió desde el manejador
+                raise TareaCancelada() from None
+            raise
+        finally:
+            con.set_progress_handler(None, 0)
+
+    def rango(self, campo, minimo=None, maximo=None):
+        return [dict(fila) for fila in self.recorrer_rango(campo, minimo, maximo)]
+
+    def resumen_categorias(self):
+        # Totales por categoría (sin importar mayúsculas) calculados por SQLite
+        return [dict(fila) for fila in self._con.execute(SQL_RESUMEN)]
+
+    def top_k(self, criterio, k, ascendente=True, categoria=None):
+        # ORDER BY ... LIMIT sobre el índice del criterio: SQLite lee solo las k primeras
+        columna = COLUMNA_ORDEN.get(criterio, "orden")
+        sentido = "" if ascendente else " DESC"
+        orden = f"{columna}{sentido}, orden{sentido}" if columna != "orden" else "orden"
+        donde, parametros = "", [max(k, 0)]
+        if categoria is not None:
+            donde, parametros = "WHERE categoria_min = ?", [categoria.lower(), max(k, 0)]
+        return [dict(fila) for fila in self._con.execute(
+            f"SELECT {COLUMNAS} FROM productos {donde} ORDER BY {orden} LIMIT ?", parametros)]
+
+    def ordenar(self, criterio):
+        return [dict(fila) for fila in self.recorrer_ordenado(criterio)]
+
+    def filtrar(self, nombre_substr="", categoria="", codigo_substr=""):
+        return [dict(fila) for fila in self.recorrer_filtrado(nombre_substr, categoria, codigo_substr)]
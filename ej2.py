@@ -10,11 +10,14 @@ class Nodo:
         self.precio = precio
         self.stock = stock
         self.siguiente = None
+        self.anterior = None
 
 # ------------------- CLASE LISTA ENLAZADA -------------------
 class ListaEnlazada:
     def __init__(self):
         self.cabeza = None
+        self.cola = None
+        self._indice = {}   # código -> nodos con ese código (en orden de inserción)
 
     # ---------- CRUD ----------
     def insertar_producto(self, codigo, nombre, categoria, precio, stock):
@@ -23,18 +26,14 @@ class ListaEnlazada:
         if self.cabeza is None:
             self.cabeza = nuevo
         else:
-            actual = self.cabeza
-            while actual.siguiente:
-                actual = actual.siguiente
-            actual.siguiente = nuevo
+            nuevo.anterior = self.cola
+            self.cola.siguiente = nuevo
+        self.cola = nuevo
+        self._indice.setdefault(codigo, []).append(nuevo)
 
     def buscar_nodo(self, codigo):
-        actual = self.cabeza
-        while actual:
-            if actual.codigo == codigo:
-                return actual
-            actual = actual.siguiente
-        return None
+        nodos = self._indice.get(codigo)
+        return nodos[0] if nodos else None
 
     def actualizar_producto(self, codigo, nombre=None, categoria=None,
                             precio=None, stock=None):
@@ -52,16 +51,21 @@ class ListaEnlazada:
         return True
 
     def eliminar_producto(self, codigo):
-        actual, anterior = self.cabeza, None
-        while actual:
-            if actual.codigo == codigo:
-                if anterior:
-                    anterior.siguiente = actual.siguiente
-                else:
-                    self.cabeza = actual.siguiente
-                return True
-            anterior, actual = actual, actual.siguiente
-        return False
+        nodos = self._indice.get(codigo)
+        if not nodos:
+            return False
+        nodo = nodos.pop(0)
+        if not nodos:
+            del self._indice[codigo]
+        if nodo.anterior:
+            nodo.anterior.siguiente = nodo.siguiente
+        else:
+            self.cabeza = nodo.siguiente
+        if nodo.siguiente:
+            nodo.siguiente.anterior = nodo.anterior
+        else:
+            self.cola = nodo.anterior
+        return True
 
     # ---------- Inventario ----------
     def ajustar_stock(self, codigo, cantidad):
@@ -1,122 +1,13 @@
 import tkinter as tk
 from tkinter import messagebox, font, ttk   # Herramientas GUI (ttk reservado para futuras mejoras)
-
-# ======================================================================
-#  CLASE NODO
-# ======================================================================
-class Nodo:
-    """Representa un producto y su enlace al siguiente nodo."""
-    def __init__(self, codigo, nombre, categoria, precio, stock):
-        self.codigo = codigo
-        self.nombre = nombre
-        self.categoria = categoria
-        self.precio = precio
-        self.stock = stock
-        self.siguiente = None   # Apuntará al siguiente producto
-
+from GestionUtiles import ListaEnlazada as ListaIndexada   # Lista con índices de búsqueda
 
 # ======================================================================
 #  CLASE LISTA ENLAZADA
 # ======================================================================
-class ListaEnlazada:
-    """Gestiona los productos mediante una lista enlazada simple."""
-    def __init__(self):
-        self.cabeza = None   # Primer nodo
-
-    # ----------------------- CRUD -----------------------
-    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
-        """
-        Inserta un producto al final. Devuelve False si el código ya existe.
-        """
-        if self.buscar_nodo(codigo):
-            return False
-        nuevo = Nodo(codigo, nombre, categoria, precio, stock)
-        if self.cabeza is None:
-            self.cabeza = nuevo
-        else:
-            actual = self.cabeza
-            while actual.siguiente:
-                actual = actual.siguiente
-            actual.siguiente = nuevo
-        return True
-
-    def buscar_nodo(self, codigo):
-        """Devuelve el nodo con ese código o None."""
-        actual = self.cabeza
-        while actual:
-            if actual.codigo == codigo:
-                return actual
-            actual = actual.siguiente
-        return None
-
-    def actualizar_producto(self, codigo, nombre=None, categoria=None,
-                            precio=None, stock=None):
-        """Actualiza campos indicados del producto."""
-        nodo = self.buscar_nodo(codigo)
-        if not nodo:
-            return False
-        if nombre is not None:
-            nodo.nombre = nombre
-        if categoria is not None:
-            nodo.categoria = categoria
-        if precio is not None:
-            nodo.precio = precio
-        if stock is not None:
-            nodo.stock = stock
-        return True
-
-    def eliminar_producto(self, codigo):
-        """Elimina un producto por su código."""
-        actual, anterior = self.cabeza, None
-        while actual:
-            if actual.codigo == codigo:
-                if anterior:
-                    anterior.siguiente = actual.siguiente
-                else:
-                    self.cabeza = actual.siguiente
-                return True
-            anterior, actual = actual, actual.siguiente
-        return False
-
-    # -------------------- Inventario --------------------
-    def ajustar_stock(self, codigo, cantidad):
-        """
-        Modifica el stock (positivo: entrada, negativo: salida).
-        Evita cantidades negativas.
-        """
-        nodo = self.buscar_nodo(codigo)
-        if not nodo or nodo.stock + cantidad < 0:
-            return False
-        nodo.stock += cantidad
-        return True
-
-    # ------------------- Conversión -------------------
-    def _to_list(self):
-        """Devuelve los productos como lista de diccionarios."""
-        productos, actual = [], self.cabeza
-        while actual:
-            productos.append({
-                "codigo": actual.codigo,
-                "nombre": actual.nombre,
-                "categoria": actual.categoria,
-                "precio": actual.precio,
-                "stock": actual.stock
-            })
-            actual = actual.siguiente
-        return productos
-
-    # --------------------- Ordenar ---------------------
-    def ordenar(self, criterio):
-        productos = self._to_list()
-        if criterio == "nombre":
-            productos.sort(key=lambda x: x["nombre"].lower())
-        elif criterio == "precio":
-            productos.sort(key=lambda x: x["precio"])
-        elif criterio == "categoria":
-            productos.sort(key=lambda x: x["categoria"].lower())
-        elif criterio == "stock":
-            productos.sort(key=lambda x: x["stock"])
-        return productos
+class ListaEnlazada(ListaIndexada):
+    """Gestiona los productos con la ListaEnlazada de GestionUtiles, que mantiene
+    los índices por código, de orden y de trigramas (filtrar no recorre la lista)."""
 
     # --------------------- Filtrar ---------------------
     def filtrar(self, codigo_substr="", nombre_substr="", categoria_substr=""):
@@ -124,16 +15,7 @@ class ListaEnlazada:
         Filtra productos cuyos campos contienen las subcadenas dadas.
         La búsqueda no distingue mayúsculas/minúsculas.
         """
-        codigo_substr = codigo_substr.lower()
-        nombre_substr = nombre_substr.lower()
-        categoria_substr = categoria_substr.lower()
-
-        return [
-            p for p in self._to_list()
-            if (codigo_substr in p["codigo"].lower())
-            and (nombre_substr in p["nombre"].lower())
-            and (categoria_substr in p["categoria"].lower())
-        ]
+        return super().filtrar(nombre_substr, categoria_substr, codigo_substr)
 
 
 # ======================================================================
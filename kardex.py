@@ -0,0 +1,148 @@
+import sys
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+# ------------------- CLASE KARDEX -------------------
+class Kardex:
+    """
+    Registro de todos los movimientos de stock (kardex): cuándo, qué producto, cuánto
+    cambió y con cuánto quedó. Solo se agregan movimientos, nunca se cambian.
+
+    Cada dato va en su propio arreglo compacto (como en ListaColumnar), así que un
+    movimiento no es un objeto de Python sino una posición en los arreglos: cien millones
+    de movimientos ocupan unos 10 GB en lugar de decenas (la prueba de volumen de abajo
+    mide un pico de unos 96 bytes por movimiento, contando las copias que se hacen al
+    crecer los arreglos). Además, cada producto guarda las
+    posiciones de sus movimientos, que quedan en orden de tiempo y se buscan por bisección.
+
+    Se conecta a una ListaEnlazada (o a un envoltorio suyo) con `lista.conectar_kardex(Kardex())`.
+    """
+
+    def __init__(self, reloj=time.time):
+        self.reloj = reloj
+        self._tiempos = array("d")      # Segundos desde 1970, nunca decrecen
+        self._productos = array("i")    # Número del código del producto
+        self._categorias = array("i")   # Número de la categoría que tenía en ese momento
+        self._deltas = array("q")       # Cuánto cambió el stock
+        self._saldos = array("q")       # Stock con que quedó
+        self._ids_codigo = {}           # código -> número
+        self._codigos = []              # número -> código
+        self._ids_categoria = {}        # categoría -> número
+        self._nombres_categoria = []    # número -> categoría
+        self._por_producto = []         # número de código -> array con las posiciones de sus movimientos
+
+    def __len__(self):
+        return len(self._tiempos)
+
+    def _id_codigo(self, codigo):
+        i = self._ids_codigo.get(codigo)
+        if i is None:
+            i = self._ids_codigo[codigo] = len(self._codigos)
+            self._codigos.append(codigo)
+            self._por_producto.append(array("q"))
+        return i
+
+    def _id_categoria(self, categoria):
+        i = self._ids_categoria.get(categoria)
+        if i is None:
+            i = self._ids_categoria[categoria] = len(self._nombres_categoria)
+            self._nombres_categoria.append(categoria)
+        return i
+
+    # ---------- REGISTRAR ----------
+    def registrar(self, codigo, delta, saldo, categoria, tiempo=None):
+        """Agrega un movimiento; si el reloj retrocede se usa la hora del último movimiento."""
+        tiempo = self.reloj() if tiempo is None else tiempo
+        if self._tiempos and tiempo < self._tiempos[-1]:
+            tiempo = self._tiempos[-1]   # Así los tiempos quedan ordenados y se puede bisecar
+        producto = self._id_codigo(codigo)
+        self._por_producto[producto].append(len(self._tiempos))
+        self._tiempos.append(tiempo)
+        self._productos.append(producto)
+        self._categorias.append(self._id_categoria(categoria))
+        self._deltas.append(delta)
+        self._saldos.append(saldo)
+
+    # ---------- CONSULTAS ----------
+    def movimientos(self, codigo, desde=None, hasta=None):
+        """
+        Movimientos de un producto entre `desde` (incluido) y `hasta` (excluido), como
+        tuplas (tiempo, delta, saldo). Cuesta O(log m + k) con m movimientos del producto.
+        """
+        producto = self._ids_codigo.get(codigo)
+        if producto is None:
+            return []
+        posiciones = self._por_producto[producto]
+        tiempo_de = self._tiempos.__getitem__
+        inicio = 0 if desde is None else bisect_left(posiciones, desde, key=tiempo_de)
+        fin = len(posiciones) if hasta is None else bisect_left(posiciones, hasta, key=tiempo_de)
+        return [(self._tiempos[i], self._deltas[i], self._saldos[i]) for i in posiciones[inicio:fin]]
+
+    def recorrer(self, desde=None, hasta=None):
+        """
+        Todos los movimientos entre `desde` (incluido) y `hasta` (excluido), en orden de
+        tiempo, como tuplas (tiempo, código, categoría, delta, saldo).
+        """
+        inicio, fin = self._posiciones_entre(desde, hasta)
+        for i in range(inicio, fin):
+            yield (self._tiempos[i], self._codigos[self._productos[i]],
+                   self._nombres_categoria[self._categorias[i]], self._deltas[i], self._saldos[i])
+
+    def _posiciones_entre(self, desde, hasta):
+        # Rango de posiciones de todos los movimientos entre desde y hasta (los tiempos están ordenados)
+        inicio = 0 if desde is None else bisect_left(self._tiempos, desde)
+        fin = len(self._tiempos) if hasta is None else bisect_left(self._tiempos, hasta)
+        return inicio, fin
+
+    def neto_diario_por_categoria(self, desde=None, hasta=None):
+        """
+        Suma de los movimientos por día (hora local) y categoría, entre desde y hasta.
+        Devuelve una lista de (día "AAAA-MM-DD", categoría, neto) ordenada por día y categoría.
+        """
+        inicio, fin = self._posiciones_entre(desde, hasta)
+        netos = {}
+        dia, fin_dia = None, -1.0
+        tiempos, categorias, deltas = self._tiempos, self._categorias, self._deltas
+        for i in range(inicio, fin):
+            if tiempos[i] >= fin_dia:   # Empezó otro día: se calcula su medianoche una sola vez
+                fecha = datetime.fromtimestamp(tiempos[i])
+                dia = fecha.date().isoformat()
+                medianoche = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+                fin_dia = (medianoche + timedelta(days=1)).timestamp()
+            clave = (dia, categorias[i])
+            netos[clave] = netos.get(clave, 0) + deltas[i]
+        return sorted((dia, self._nombres_categoria[c], neto) for (dia, c), neto in netos.items())
+
+    def memoria(self):
+        """Bytes que ocupan los arreglos de movimientos y de posiciones por producto."""
+        columnas = (self._tiempos, self._productos, self._categorias, self._deltas, self._saldos)
+        return (sum(c.itemsize * len(c) for c in columnas)
+                + sum(sys.getsizeof(p) for p in self._por_producto))
+
+
+# ------------------- PRUEBA DE VOLUMEN -------------------
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    kardex = Kardex()
+    inicio_t = time.time() - 30 * 86400
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for i in range(n):
+        kardex.registrar(str(i % 50_000), (i % 7) - 3, i % 100, f"Categoría {i % 12}",
+                         tiempo=inicio_t + i * (30 * 86400 / n))
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{n:,} movimientos en {segundos:.1f} s | {pico / n:.1f} bytes por movimiento")
+
+    inicio = time.perf_counter()
+    ultimos = kardex.movimientos("123", desde=inicio_t + 29 * 86400)
+    print(f"movimientos de un producto en el último día: {len(ultimos)} "
+          f"en {(time.perf_counter() - inicio) * 1000:.2f} ms")
+    inicio = time.perf_counter()
+    netos = kardex.neto_diario_por_categoria(desde=inicio_t + 28 * 86400)
+    print(f"neto diario por categoría (2 días): {len(netos)} filas "
+          f"en {(time.perf_counter() - inicio) * 1000:.0f} ms")
@@ -0,0 +1,172 @@
+import random
+import sys
+import threading
+import time
+
+from GestionUtiles import ListaEnlazada
+
+# ------------------- CLASE LISTA CONCURRENTE -------------------
+class ListaConcurrente(ListaEnlazada):
+    """
+    ListaEnlazada que se puede usar desde varios hilos a la vez (por ejemplo, varias cajas).
+
+    - Cada código usa uno de `franjas` candados (elegido por hash). Quien cambia un producto
+      toma su candado, así que revisar y cambiar el stock es una sola operación: nunca queda
+      negativo aunque dos hilos vendan el mismo producto al mismo tiempo. Hilos que trabajan
+      con productos distintos no se esperan entre sí para esa revisión.
+    - Los índices compartidos (código, orden, trigramas) se tocan solo dentro de un candado
+      de estructura, que se toma el tiempo justo para actualizarlos.
+    - ordenar y filtrar no toman ningún candado por producto: copian el índice que necesitan
+      (una copia rápida dentro del candado de estructura) y recorren esa copia sin bloquear.
+    """
+
+    def __init__(self, franjas=64):
+        super().__init__()
+        self._candados = [threading.Lock() for _ in range(franjas)]
+        self._estructura = threading.Lock()
+
+    def _candado(self, codigo):
+        return self._candados[hash(codigo) % len(self._candados)]
+
+    # ---------- ESCRITURAS ----------
+    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
+        with self._candado(codigo), self._estructura:
+            return super().insertar_producto(codigo, nombre, categoria, precio, stock)
+
+    def insertar_lote(self, filas):
+        filas = list(filas)   # Se leen antes de tomar el candado
+        with self._estructura:
+            return super().insertar_lote(filas)
+
+    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
+        with self._candado(codigo), self._estructura:
+            return super().actualizar_producto(codigo, nombre, categoria, precio, stock)
+
+    def eliminar_producto(self, codigo):
+        with self._candado(codigo), self._estructura:
+            return super().eliminar_producto(codigo)
+
+    def ajustar_stock(self, codigo, cantidad):
+        # La revisión y el cambio van bajo el candado del producto; el candado de
+        # estructura solo se toma para reacomodar el índice de stock
+        with self._candado(codigo):
+            nodo = self._indice.get(codigo)
+            if not nodo or nodo.stock + cantidad < 0:
+                return False
+            with self._estructura:
+                self._aplicar_stock(nodo, cantidad)
+            return True
+
+    def ajustar_stock_lote(self, movimientos):
+        # Toma los candados de todos los códigos del pedido, siempre en el mismo orden
+        # para que dos pedidos con productos en común no se queden esperándose
+        movimientos = list(movimientos)
+        franjas = sorted({hash(codigo) % len(self._candados) for codigo, _ in movimientos})
+        for f in franjas:
+            self._candados[f].acquire()
+        try:
+            with self._estructura:
+                return super().ajustar_stock_lote(movimientos)
+        finally:
+            for f in franjas:
+                self._candados[f].release()
+
+    def conectar_kardex(self, kardex):
+        with self._estructura:
+            return super().conectar_kardex(kardex)
+
+    def definir_umbral_producto(self, codigo, umbral):
+        with self._estructura:
+            return super().definir_umbral_producto(codigo, umbral)
+
+    def definir_umbral_categoria(self, categoria, umbral):
+        with self._estructura:
+            return super().definir_umbral_categoria(categoria, umbral)
+
+    # ---------- LECTURAS SOBRE UNA COPIA ----------
+    def alertas(self, limite=None):
+        with self._estructura:
+            return super().alertas(limite)
+
+    def resumen_categorias(self):
+        with self._estructura:
+            return super().resumen_categorias()
+
+    def _nodos_ordenados(self, criterio):
+        with self._estructura:
+            if criterio not in self._ordenados:
+                return self._nodos()
+            entradas = self._indice_orden(criterio)[:]
+        return (nodo for _, _, nodo in entradas)
+
+    def _nodos_rango(self, campo, minimo, maximo):
+        with self._estructura:
+            return super()._nodos_rango(campo, minimo, maximo)
+
+    def _nodos_top_k(self, criterio, k, ascendente, categoria):
+        # Elige los k dentro del candado: recorre índices que otros hilos pueden estar cambiando
+        with self._estructura:
+            return super()._nodos_top_k(criterio, k, ascendente, categoria)
+
+    def _nodos_parecidos(self, texto, distancia, limite):
+        with self._estructura:
+            return super()._nodos_parecidos(texto, distancia, limite)
+
+    def _nodos_filtrados(self, nombre_substr, categoria, codigo_substr, progreso=None):
+        # Los candidatos salen de los índices dentro del candado; la revisión fina, fuera
+        with self._estructura:
+            return super()._nodos_filtrados(nombre_substr, categoria, codigo_substr, progreso)
+
+
+# ------------------- PRUEBA DE CARGA CON VARIOS HILOS -------------------
+class _ListaCandadoGlobal(ListaEnlazada):
+    # Referencia para comparar: un único candado para todas las operaciones
+    def __init__(self):
+        super().__init__()
+        self._candado_global = threading.Lock()
+
+    def ajustar_stock(self, codigo, cantidad):
+        with self._candado_global:
+            return super().ajustar_stock(codigo, cantidad)
+
+
+def prueba_de_carga(clase, hilos, operaciones=20_000, productos=1_000, stock_inicial=50):
+    """
+    Lanza `hilos` hilos que hacen `operaciones` entradas/salidas de stock al azar cada uno.
+    Devuelve operaciones por segundo y verifica que el stock final cuadre y no sea negativo.
+    """
+    lista = clase()
+    lista.insertar_lote((str(i), f"Producto {i}", "General", 1.0, stock_inicial)
+                        for i in range(productos))
+    aplicados = [0] * hilos   # Suma de las cantidades que sí se aplicaron, por hilo
+
+    def trabajar(n):
+        azar = random.Random(n)
+        total = 0
+        for _ in range(operaciones):
+            cantidad = azar.randint(-5, 4)
+            if lista.ajustar_stock(str(azar.randrange(productos)), cantidad):
+                total += cantidad
+        aplicados[n] = total
+
+    trabajadores = [threading.Thread(target=trabajar, args=(n,)) for n in range(hilos)]
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    segundos = time.perf_counter() - inicio
+
+    stocks = [p["stock"] for p in lista._to_list()]
+    assert min(stocks) >= 0, "quedó stock negativo"
+    assert sum(stocks) == productos * stock_inicial + sum(aplicados), "el stock no cuadra"
+    return hilos * operaciones / segundos
+
+
+if __name__ == "__main__":
+    operaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"{'hilos':>5} {'ListaConcurrente':>18} {'candado global':>16}   (operaciones/seg)")
+    for hilos in (1, 2, 4, 8, 16):
+        concurrente = prueba_de_carga(ListaConcurrente, hilos, operaciones)
+        global_ = prueba_de_carga(_ListaCandadoGlobal, hilos, operaciones)
+        print(f"{hilos:>5} {concurrente:>18,.0f} {global_:>16,.0f}")
@@ -0,0 +1,84 @@
+import argparse
+import os
+
+# ------------------- REGISTRO DE MOTORES DE ALMACENAMIENTO -------------------
+# Cada motor es una función que recibe la carpeta de datos y devuelve una lista de
+# productos con los métodos de ListaEnlazada más cerrar(). La App no sabe cuál usa:
+# se elige al arrancar con --motor o con la variable de entorno INVENTARIO_MOTOR.
+VARIABLE_ENTORNO = "INVENTARIO_MOTOR"
+MOTOR_POR_DEFECTO = "enlazada"
+MOTORES = {}
+
+
+def registrar_motor(nombre):
+    """Decorador para agregar un motor al registro con ese nombre."""
+    def agregar(fabrica):
+        MOTORES[nombre] = fabrica
+        return fabrica
+    return agregar
+
+
+def abrir_motor(nombre=None, carpeta="inventario_datos"):
+    """Crea la lista del motor pedido (o el de INVENTARIO_MOTOR, o el de por defecto)."""
+    nombre = nombre or os.environ.get(VARIABLE_ENTORNO) or MOTOR_POR_DEFECTO
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor desconocido: {nombre} (disponibles: {', '.join(MOTORES)})")
+    return MOTORES[nombre](carpeta)
+
+
+def elegir_motor(argv=None):
+    """Lee --motor y --datos de la línea de comandos y abre ese motor."""
+    parser = argparse.ArgumentParser(description="Gestor de productos escolares")
+    parser.add_argument("--motor", choices=sorted(MOTORES),
+                        help=f"motor de almacenamiento (o la variable {VARIABLE_ENTORNO})")
+    parser.add_argument("--datos", default="inventario_datos", help="carpeta de datos")
+    args = parser.parse_args(argv)
+    return abrir_motor(args.motor, args.datos)
+
+
+# ------------------- MOTORES DISPONIBLES -------------------
+# Los motores en memoria comparten la misma carpeta y formato de persistencia, así que
+# se puede cambiar entre ellos sin perder los productos.
+@registrar_motor("enlazada")
+def _enlazada(carpeta):
+    from GestionUtiles import ListaEnlazada
+    from persistencia import InventarioPersistente
+    return InventarioPersistente(ListaEnlazada(), carpeta)
+
+
+@registrar_motor("concurrente")
+def _concurrente(carpeta):
+    from lista_concurrente import ListaConcurrente
+    from persistencia import InventarioPersistente
+    return InventarioPersistente(ListaConcurrente(), carpeta)
+
+
+@registrar_motor("columnar")
+def _columnar(carpeta):
+    from catalogo_columnar import ListaColumnar
+    from persistencia import InventarioPersistente
+    return InventarioPersistente(ListaColumnar(), carpeta)
+
+
+@registrar_motor("sqlite")
+def _sqlite(carpeta):
+    from catalogo_sqlite import ListaSQLite
+    os.makedirs(carpeta, exist_ok=True)
+    return ListaSQLite(os.path.join(carpeta, "inventario.db"))
+
+
+@registrar_motor("mmap")
+def _mmap(carpeta):
+    from catalogo_mmap import CatalogoMapeado, escribir_catalogo
+
+    class CatalogoGuardado(CatalogoMapeado):
+        # Al cerrar se escriben los cambios en el archivo (si los hay)
+        def cerrar(self):
+            self.guardar()
+            super().cerrar()
+
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, "catalogo.cat")
+    if not os.path.exists(ruta):
+        escribir_catalogo(ruta, [])
+    return CatalogoGuardado(ruta)
@@ -0,0 +1,373 @@
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+# ------------------- FORMATO DE LOS ARCHIVOS -------------------
+# Registro de cambios (cambios-<generación>.log): una entrada por cada operación que sí se aplicó.
+#   cabecera "<IIB" = crc32 de (operación + datos), largo de los datos, operación
+#   datos = textos como "<I" largo + utf-8, precio "<d", stock y cantidades "<q"
+# Foto del catálogo (catalogo.snap): MAGIA, generación "<q", cantidad "<I" y luego los
+# productos por columnas, en el orden de la lista: "<I" largo + JSON utf-8 con las listas
+# [códigos, nombres, categorías], los precios como "<d" y los stocks como "<q" seguidos.
+# Así se lee con json.loads y array.frombytes, sin recorrer los bytes producto por producto.
+# Las fotos viejas (MAGIA_FILAS) tienen un registro INSERTAR por producto y se siguen leyendo.
+INSERTAR, ACTUALIZAR, ELIMINAR, AJUSTAR = 1, 2, 3, 4
+CABECERA = struct.Struct("<IIB")
+MAGIA = b"INV2"
+MAGIA_FILAS = b"INV1"
+FOTO = "catalogo.snap"
+
+_LARGO = struct.Struct("<I")
+_DOBLE = struct.Struct("<d")
+_ENTERO = struct.Struct("<q")
+
+
+def _texto(valor):
+    datos = str(valor).encode("utf-8")
+    return _LARGO.pack(len(datos)) + datos
+
+
+def _datos_producto(codigo, nombre, categoria, precio, stock):
+    return (_texto(codigo) + _texto(nombre) + _texto(categoria)
+            + _DOBLE.pack(precio) + _ENTERO.pack(stock))
+
+
+def _leer_texto(buf, pos):
+    (largo,) = _LARGO.unpack_from(buf, pos)
+    pos += 4
+    return str(buf[pos:pos + largo], "utf-8"), pos + largo
+
+
+def _leer_producto(buf, pos):
+    codigo, pos = _leer_texto(buf, pos)
+    nombre, pos = _leer_texto(buf, pos)
+    categoria, pos = _leer_texto(buf, pos)
+    (precio,) = _DOBLE.unpack_from(buf, pos)
+    (stock,) = _ENTERO.unpack_from(buf, pos + 8)
+    return (codigo, nombre, categoria, precio, stock), pos + 16
+
+
+def _leer_columnas(buf, cantidad):
+    # Productos de una foto por columnas, como tuplas (codigo, nombre, categoria, precio, stock)
+    (largo,) = _LARGO.unpack_from(buf, 16)
+    pos = 20 + largo
+    codigos, nombres, categorias = json.loads(str(buf[20:pos], "utf-8"))
+    precios, stocks = _columna("d"), _columna("q")
+    precios.frombytes(buf[pos:pos + 8 * cantidad])
+    stocks.frombytes(buf[pos + 8 * cantidad:pos + 16 * cantidad])
+    if sys.byteorder == "big":
+        precios.byteswap()
+        stocks.byteswap()
+    return zip(codigos, nombres, categorias, precios, stocks)
+
+
+def _columna(tipo, valores=()):
+    # Arreglo de números en little-endian, como el resto del formato
+    columna = array(tipo, valores)
+    if sys.byteorder == "big":
+        columna.byteswap()
+    return columna
+
+
+def _ruta_log(carpeta, generacion):
+    return os.path.join(carpeta, f"cambios-{generacion}.log")
+
+
+def _leer_foto(ruta):
+    # Devuelve (generación, productos como tuplas) de la foto; (0, ()) si todavía no hay foto
+    if not os.path.exists(ruta):
+        return 0, ()
+    with open(ruta, "rb") as f:
+        buf = memoryview(f.read())
+    if bytes(buf[:4]) not in (MAGIA, MAGIA_FILAS):
+        raise ValueError(f"{ruta} no es una foto de catálogo válida")
+    (generacion,) = _ENTERO.unpack_from(buf, 4)
+    (cantidad,) = _LARGO.unpack_from(buf, 12)
+    if bytes(buf[:4]) == MAGIA:
+        return generacion, _leer_columnas(buf, cantidad)
+
+    def productos():
+        pos = 16
+        for _ in range(cantidad):
+            producto, pos = _leer_producto(buf, pos)
+            yield producto
+    return generacion, productos()
+
+
+def _leer_registro(buf):
+    # Entradas válidas del registro como (operación, argumentos del método de la lista),
+    # y hasta qué byte era válido (lo que sigue quedó a medio escribir)
+    entradas, pos = [], 0
+    while pos + CABECERA.size <= len(buf):
+        crc, largo, operacion = CABECERA.unpack_from(buf, pos)
+        inicio = pos + CABECERA.size
+        datos = buf[inicio:inicio + largo]
+        if len(datos) < largo or zlib.crc32(datos, zlib.crc32(bytes([operacion]))) != crc:
+            break
+        if operacion == INSERTAR:
+            args = _leer_producto(datos, 0)[0]
+        elif operacion == ACTUALIZAR:
+            codigo, p = _leer_texto(datos, 0)
+            campos, p = datos[p], p + 1
+            nombre = categoria = precio = stock = None
+            if campos & 1:
+                nombre, p = _leer_texto(datos, p)
+            if campos & 2:
+                categoria, p = _leer_texto(datos, p)
+            if campos & 4:
+                (precio,), p = _DOBLE.unpack_from(datos, p), p + 8
+            if campos & 8:
+                (stock,), p = _ENTERO.unpack_from(datos, p), p + 8
+            args = (codigo, nombre, categoria, precio, stock)
+        elif operacion == ELIMINAR:
+            args = (_leer_texto(datos, 0)[0],)
+        else:
+            codigo, p = _leer_texto(datos, 0)
+            args = (codigo, _ENTERO.unpack_from(datos, p)[0])
+        entradas.append((operacion, args))
+        pos = inicio + largo
+    return entradas, pos
+
+
+# Método de la lista que vuelve a aplicar cada operación del registro
+METODOS = {INSERTAR: "insertar_producto", ACTUALIZAR: "actualizar_producto",
+           ELIMINAR: "eliminar_producto", AJUSTAR: "ajustar_stock"}
+
+
+# ------------------- CLASE INVENTARIO PERSISTENTE -------------------
+class InventarioPersistente:
+    """
+    Envuelve una lista de productos (ListaEnlazada o cualquiera con sus mismos métodos)
+    y guarda en disco cada cambio que se aplica con éxito.
+
+    - Al crearse, carga la última foto del catálogo y vuelve a aplicar el registro de cambios.
+    - Los cambios se escriben en un hilo aparte: la interfaz solo los deja en una cola.
+      El hilo junta todos los que llegan en `espera` segundos y hace un único fsync por grupo.
+    - Cada `compactar_cada` cambios se guarda una foto nueva y se empieza un registro vacío.
+      La foto la arma el hilo escritor con la foto anterior y el registro que él mismo
+      escribió, así que quien hace el cambio (la interfaz) no copia el catálogo.
+    - Cada cambio se aplica y se encola dentro de un mismo candado, así que con una lista
+      que se usa desde varios hilos (ListaConcurrente) el registro queda en el mismo orden
+      en que se aplicaron los cambios y ninguna foto se toma entre un cambio y su registro.
+    Las consultas (ordenar, filtrar, recorrer...) pasan directo a la lista envuelta.
+    """
+
+    def __init__(self, lista, carpeta, compactar_cada=100_000, espera=0.01):
+        self._lista = lista
+        self.carpeta = carpeta
+        self.compactar_cada = compactar_cada
+        self.espera = espera
+        os.makedirs(carpeta, exist_ok=True)
+        self._candado = threading.RLock()   # Aplicar + encolar (y las fotos) de a uno
+
+        self._generacion = self._recuperar()
+        self._cambios = 0                     # Cambios escritos desde la última foto
+        self._cola = queue.Queue()
+        self._error = None                    # Error de disco del hilo escritor, si lo hubo
+        self._archivo = open(_ruta_log(carpeta, self._generacion), "ab")
+        self._hilo = threading.Thread(target=self._escribir, name="escritor-inventario", daemon=True)
+        self._hilo.start()
+
+    def __len__(self):
+        return len(self._lista)
+
+    def __getattr__(self, nombre):
+        # Todo lo que no sea un cambio se le pide directamente a la lista envuelta
+        return getattr(self._lista, nombre)
+
+    # ---------- OPERACIONES QUE MODIFICAN EL INVENTARIO ----------
+    def insertar_producto(self, codigo, nombre, categoria, precio, stock):
+        with self._candado:
+            ok = self._lista.insertar_producto(codigo, nombre, categoria, precio, stock)
+            if ok:
+                self._anotar(INSERTAR, _datos_producto(codigo, nombre, categoria, precio, stock))
+            return ok
+
+    def insertar_lote(self, filas):
+        filas = list(filas)
+        with self._candado:
+            rechazadas = self._lista.insertar_lote(filas)
+            malas = {i for i, _, _ in rechazadas}
+            # Todo el lote viaja a la cola como un solo elemento
+            self._anotar_varios(INSERTAR, [_datos_producto(*fila)
+                                           for i, fila in enumerate(filas) if i not in malas])
+            return rechazadas
+
+    def actualizar_producto(self, codigo, nombre=None, categoria=None, precio=None, stock=None):
+        with self._candado:
+            ok = self._lista.actualizar_producto(codigo, nombre, categoria, precio, stock)
+            if ok:
+                # Un byte indica qué campos vienen: 1 nombre, 2 categoría, 4 precio, 8 stock
+                campos, datos = 0, b""
+                if nombre is not None:
+                    campos, datos = campos | 1, datos + _texto(nombre)
+                if categoria is not None:
+                    campos, datos = campos | 2, datos + _texto(categoria)
+                if precio is not None:
+                    campos, datos = campos | 4, datos + _DOBLE.pack(precio)
+                if stock is not None:
+                    campos, datos = campos | 8, datos + _ENTERO.pack(stock)
+                self._anotar(ACTUALIZAR, _texto(codigo) + bytes([campos]) + datos)
+            return ok
+
+    def eliminar_producto(self, codigo):
+        with self._candado:
+            ok = self._lista.eliminar_producto(codigo)
+            if ok:
+                self._anotar(ELIMINAR, _texto(codigo))
+            return ok
+
+    def ajustar_stock(self, codigo, cantidad):
+        with self._candado:
+            ok = self._lista.ajustar_stock(codigo, cantidad)
+            if ok:
+                self._anotar(AJUSTAR, _texto(codigo) + _ENTERO.pack(cantidad))
+            return ok
+
+    def ajustar_stock_lote(self, movimientos):
+        movimientos = list(movimientos)
+        with self._candado:
+            fallas = self._lista.ajustar_stock_lote(movimientos)
+            if not fallas:   # Se aplicó todo: se anota cada línea
+                self._anotar_varios(AJUSTAR, [_texto(codigo) + _ENTERO.pack(cantidad)
+                                              for codigo, cantidad in movimientos])
+            return fallas
+
+    # ---------- FOTO Y CIERRE ----------
+    def compactar(self):
+        """
+        Pide al hilo escritor que guarde una foto del catálogo y empiece un registro nuevo.
+        Solo deja una marca en la cola: la foto tiene todos los cambios encolados antes.
+        """
+        with self._candado:
+            self._cambios = 0
+            self._cola.put(("foto",))
+
+    def cerrar(self):
+        """Espera a que todo quede escrito en disco y cierra el registro."""
+        self._cola.put(None)
+        self._hilo.join()
+        self._archivo.close()
+        if self._error:
+            raise self._error
+
+    def _anotar(self, operacion, datos):
+        self._anotar_varios(operacion, [datos])
+
+    def _anotar_varios(self, operacion, lista_datos):
+        if self._error:
+            raise self._error
+        if not lista_datos:
+            return
+        self._cola.put((operacion, lista_datos))
+        self._cambios += len(lista_datos)
+        if self._cambios >= self.compactar_cada:
+            self.compactar()
+
+    # ---------- HILO ESCRITOR (COMMIT EN GRUPO) ----------
+    def _escribir(self):
+        terminar = False
+        while not terminar:
+            grupo = [self._cola.get()]
+            limite = time.monotonic() + self.espera
+            try:
+                while grupo[-1] is not None:   # Junta lo que llegue durante `espera` segundos
+                    grupo.append(self._cola.get(timeout=max(0, limite - time.monotonic())))
+            except queue.Empty:
+                pass
+            try:
+                for item in grupo:
+                    if item is None:
+                        terminar = True
+                    elif item[0] == "foto":
+                        self._guardar_foto()
+                    else:
+                        operacion, lista_datos = item
+                        crc_operacion = zlib.crc32(bytes([operacion]))
+                        self._archivo.write(b"".join(
+                            CABECERA.pack(zlib.crc32(datos, crc_operacion), len(datos), operacion) + datos
+                            for datos in lista_datos))
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())   # Un solo fsync para todo el grupo
+            except OSError as e:
+                self._error = e
+                return
+
+    def _guardar_foto(self):
+        # Antes de cambiar de generación, el registro actual tiene que estar en disco
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        generacion = self._generacion + 1
+        ruta = os.path.join(self.carpeta, FOTO)
+        productos = self._productos_escritos()
+        codigos, nombres, categorias, precios, stocks = zip(*productos) if productos else ([],) * 5
+        textos = json.dumps([[str(c) for c in codigos], nombres, categorias],
+                            ensure_ascii=False).encode("utf-8")
+        with open(ruta + ".tmp", "wb") as f:
+            f.write(MAGIA + _ENTERO.pack(generacion) + _LARGO.pack(len(productos)))
+            f.write(_LARGO.pack(len(textos)) + textos)
+            f.write(_columna("d", precios).tobytes())
+            f.write(_columna("q", stocks).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta + ".tmp", ruta)   # La foto nueva aparece completa o no aparece
+        self._archivo.close()
+        os.remove(_ruta_log(self.carpeta, self._generacion))
+        self._generacion = generacion
+        self._archivo = open(_ruta_log(self.carpeta, generacion), "ab")
+
+    def _productos_escritos(self):
+        # El catálogo según lo que ya está en disco: la foto anterior con su registro aplicado.
+        # El registro solo tiene cambios que se aplicaron con éxito, así que basta un diccionario
+        # en el orden de la lista (un producto eliminado y vuelto a insertar pasa al final).
+        _, productos = _leer_foto(os.path.join(self.carpeta, FOTO))
+        catalogo = {codigo: [nombre, categoria, precio, stock]
+                    for codigo, nombre, categoria, precio, stock in productos}
+        with open(_ruta_log(self.carpeta, self._generacion), "rb") as f:
+            entradas, _ = _leer_registro(memoryview(f.read()))
+        for operacion, (codigo, *datos) in entradas:
+            if operacion == INSERTAR:
+                catalogo[codigo] = datos
+            elif operacion == ACTUALIZAR:
+                producto = catalogo[codigo]
+                for i, valor in enumerate(datos):
+                    if valor is not None:
+                        producto[i] = valor
+            elif operacion == ELIMINAR:
+                del catalogo[codigo]
+            else:
+                catalogo[codigo][3] += datos[0]
+        return [(codigo, *datos) for codigo, datos in catalogo.items()]
+
+    # ---------- RECUPERACIÓN AL ARRANCAR ----------
+    def _recuperar(self):
+        # Carga la foto, aplica el registro de su misma generación y devuelve esa generación
+        generacion, productos = _leer_foto(os.path.join(self.carpeta, FOTO))
+        if productos:
+            self._lista.insertar_lote(productos)
+
+        ruta_log = _ruta_log(self.carpeta, generacion)
+        if os.path.exists(ruta_log):
+            with open(ruta_log, "rb") as f:
+                buf = memoryview(f.read())
+            valido = self._aplicar_registro(buf)
+            if valido < len(buf):   # El final quedó a medio escribir: se descarta
+                with open(ruta_log, "r+b") as f:
+                    f.truncate(valido)
+        for archivo in os.listdir(self.carpeta):   # Registros viejos que ya están en la foto
+            if archivo.startswith("cambios-") and archivo != os.path.basename(ruta_log):
+                os.remove(os.path.join(self.carpeta, archivo))
+        return generacion
+
+    def _aplicar_registro(self, buf):
+        # Vuelve a aplicar los cambios del registro; devuelve hasta qué byte era válido
+        entradas, valido = _leer_registro(buf)
+        for operacion, args in entradas:
+            getattr(self._lista, METODOS[operacion])(*args)
+        return valido
@@ -10,37 +10,35 @@ class Nodo:
         self.precio = precio
         self.stock = stock
         self.siguiente = None
+        self.anterior = None
 
 # ------------------- CLASE LISTA ENLAZADA -------------------
 class ListaEnlazada:
     def __init__(self):
         self.cabeza = None
+        self.cola = None
+        self._indice = {}   # código -> nodo
 
     # ---------- CRUD ----------
     def insertar_producto(self, codigo, nombre, categoria, precio, stock):
         """Inserta un nuevo producto al final de la lista.
         Devuelve True si se insertó, False si el código ya existe."""
         # Evitar códigos duplicados
-        if self.buscar_nodo(codigo):
+        if codigo in self._indice:
             return False
 
         nuevo = Nodo(codigo, nombre, categoria, precio, stock)
         if self.cabeza is None:
             self.cabeza = nuevo
         else:
-            actual = self.cabeza
-            while actual.siguiente:
-                actual = actual.siguiente
-            actual.siguiente = nuevo
+            nuevo.anterior = self.cola
+            self.cola.siguiente = nuevo
+        self.cola = nuevo
+        self._indice[codigo] = nuevo
         return True
 
     def buscar_nodo(self, codigo):
-        actual = self.cabeza
-        while actual:
-            if actual.codigo == codigo:
-                return actual
-            actual = actual.siguiente
-        return None
+        return self._indice.get(codigo)
 
     def actualizar_producto(self, codigo, nombre=None, categoria=None,
                             precio=None, stock=None):
@@ -58,16 +56,18 @@ class ListaEnlazada:
         return True
 
     def eliminar_producto(self, codigo):
-        actual, anterior = self.cabeza, None
-        while actual:
-            if actual.codigo == codigo:
-                if anterior:
-                    anterior.siguiente = actual.siguiente
-                else:
-                    self.cabeza = actual.siguiente
-                return True
-            anterior, actual = actual, actual.siguiente
-        return False
+        nodo = self._indice.pop(codigo, None)
+        if not nodo:
+            return False
+        if nodo.anterior:
+            nodo.anterior.siguiente = nodo.siguiente
+        else:
+            self.cabeza = nodo.siguiente
+        if nodo.siguiente:
+            nodo.siguiente.anterior = nodo.anterior
+        else:
+            self.cola = nodo.anterior
+        return True
 
     # ---------- Inventario ----------
     def ajustar_stock(self, codigo, cantidad):
@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+
+from GestionUtiles import ListaEnlazada, CAMPOS
+from motores import MOTORES, abrir_motor
+
+# ------------------- PROTOCOLO -------------------
+# Una petición por línea, en JSON:   {"id": 7, "op": "ajustar_stock", "args": ["15", -2]}
+# Una respuesta por línea, en JSON:  {"id": 7, "resultado": true}   o   {"id": 7, "error": "..."}
+# Un cliente puede mandar muchas peticiones sin esperar (pipelining); las respuestas
+# de cada conexión llegan en el mismo orden en que se enviaron las peticiones.
+#
+# Los argumentos llegan tal como vienen en el JSON, así que se revisan antes de tocar la
+# lista: un código que no es texto o un precio que no es número dejaría los índices a medias.
+
+
+def _es_texto(valor):
+    return isinstance(valor, str)
+
+
+def _es_entero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _es_cantidad(valor):
+    return _es_entero(valor) and valor >= 0
+
+
+def _es_precio(valor):
+    # json.loads acepta NaN e Infinity: no se pueden ordenar en el índice de precio
+    return (isinstance(valor, (int, float)) and not isinstance(valor, bool)
+            and math.isfinite(valor) and valor >= 0)
+
+
+def _es_fila(fila):
+    # Una fila con otra cantidad de datos la rechaza insertar_lote; con 5, se revisa cada uno
+    return isinstance(fila, list) and (len(fila) != 5 or _args_validos(FILA, fila))
+
+
+def _es_movimiento(movimiento):
+    return isinstance(movimiento, list) and _args_validos(MOVIMIENTO, movimiento)
+
+
+def _lista_de(revisar):
+    return lambda valor: isinstance(valor, list) and all(revisar(v) for v in valor)
+
+
+def _o_nada(revisar):
+    return lambda valor: valor is None or revisar(valor)
+
+
+FILA = (("codigo", _es_texto), ("nombre", _es_texto), ("categoria", _es_texto),
+        ("precio", _es_precio), ("stock", _es_cantidad))
+MOVIMIENTO = (("codigo", _es_texto), ("cantidad", _es_entero))
+
+# Operación -> (argumentos obligatorios, argumentos opcionales), cada uno (nombre, revisión)
+OPERACIONES = {
+    "insertar_producto": (FILA, ()),
+    "insertar_lote": ((("filas", _lista_de(_es_fila)),), ()),
+    "buscar_nodo": ((("codigo", _es_texto),), ()),
+    "actualizar_producto": ((("codigo", _es_texto),),
+                            tuple((nombre, _o_nada(revisar)) for nombre, revisar in FILA[1:])),
+    "eliminar_producto": ((("codigo", _es_texto),), ()),
+    "ajustar_stock": (MOVIMIENTO, ()),
+    "ajustar_stock_lote": ((("movimientos", _lista_de(_es_movimiento)),), ()),
+    "ordenar": ((("criterio", _es_texto),), ()),
+    "filtrar": ((), (("nombre_substr", _es_texto), ("categoria", _es_texto),
+                     ("codigo_substr", _es_texto))),
+}
+
+
+def _args_validos(firma, args):
+    return len(args) == len(firma) and all(revisar(v) for (_, revisar), v in zip(firma, args))
+
+
+def validar(op, args):
+    """Lanza ValueError si args no sirven para la operación (cantidad o tipo de algún dato)."""
+    if not isinstance(args, list):
+        raise ValueError("Los argumentos deben ser una lista")
+    obligatorios, opcionales = OPERACIONES[op]
+    if not len(obligatorios) <= len(args) <= len(obligatorios) + len(opcionales):
+        raise ValueError(f"{op} recibe de {len(obligatorios)} a "
+                         f"{len(obligatorios) + len(opcionales)} argumentos")
+    for (nombre, revisar), valor in zip(obligatorios + opcionales, args):
+        if not revisar(valor):
+            raise ValueError(f"Argumento inválido para {op}: {nombre}")
+
+
+# ------------------- CLASE SERVIDOR -------------------
+class ServidorInventario:
+    """
+    Comparte una sola lista de productos entre muchas cajas o páginas web por TCP.
+
+    Todo corre en el mismo bucle de asyncio, así que la lista nunca se usa desde dos
+    hilos a la vez. Los ajustes de stock de todas las conexiones se juntan durante
+    `espera_lote` segundos (o hasta `max_lote`) y se aplican con un solo
+    ajustar_stock_lote. Si alguno falla, se aplican uno por uno en el mismo orden,
+    así que cada cliente recibe exactamente la respuesta que tendría sin agrupar.
+    """
+
+    def __init__(self, lista, espera_lote=0.002, max_lote=1024):
+        self.lista = lista
+        self.espera_lote = espera_lote
+        self.max_lote = max_lote
+        self._pendientes = []   # (id, codigo, cantidad, futuro) esperando al próximo lote
+        self._temporizador = None
+
+    async def iniciar(self, host="127.0.0.1", puerto=8765):
+        return await asyncio.start_server(self._atender, host, puerto, limit=2 ** 24, backlog=4096)
+
+    # ---------- CONEXIONES ----------
+    async def _atender(self, reader, writer):
+        respuestas = asyncio.Queue()
+        escritor = asyncio.create_task(self._responder(writer, respuestas))
+        try:
+            while linea := await reader.readline():
+                respuestas.put_nowait(self._procesar(linea))
+        except ConnectionError:
+            pass
+        finally:
+            respuestas.put_nowait(None)
+            await escritor
+            writer.close()
+
+    async def _responder(self, writer, respuestas):
+        # Envía las respuestas en orden; solo espera al socket cuando no hay más listas
+        while (futuro := await respuestas.get()) is not None:
+            respuesta = await futuro
+            try:
+                writer.write(json.dumps(respuesta).encode() + b"\n")
+                if respuestas.empty():
+                    await writer.drain()
+            except ConnectionError:
+                pass
+
+    def _procesar(self, linea):
+        # Devuelve un futuro con la respuesta a una línea del cliente
+        futuro = asyncio.get_running_loop().create_future()
+        try:
+            peticion = json.loads(linea)
+            id_, op, args = peticion.get("id"), peticion.get("op"), peticion.get("args", [])
+        except (ValueError, AttributeError):
+            futuro.set_result({"id": None, "error": "Petición inválida"})
+            return futuro
+        if not isinstance(op, str) or op not in OPERACIONES:
+            futuro.set_result({"id": id_, "error": f"Operación desconocida: {op}"})
+            return futuro
+        try:
+            validar(op, args)
+        except ValueError as e:
+            futuro.set_result({"id": id_, "error": str(e)})
+            return futuro
+        if op == "ajustar_stock":
+            self._encolar_ajuste(id_, args[0], args[1], futuro)
+        else:
+            # Antes de cualquier otra operación se aplican los ajustes que esperan,
+            # para que todo quede en el mismo orden en que llegó
+            self._aplicar_lote()
+            try:
+                futuro.set_result({"id": id_, "resultado": self._ejecutar(op, args)})
+            except (TypeError, ValueError, AttributeError, KeyError) as e:
+                futuro.set_result({"id": id_, "error": str(e)})
+        return futuro
+
+    def _ejecutar(self, op, args):
+        resultado = getattr(self.lista, op)(*args)
+        if op == "buscar_nodo":
+            return None if resultado is None else {c: getattr(resultado, c) for c in CAMPOS}
+        return resultado
+
+    # ---------- MICRO-LOTES DE AJUSTES DE STOCK ----------
+    def _encolar_ajuste(self, id_, codigo, cantidad, futuro):
+        self._pendientes.append((id_, codigo, cantidad, futuro))
+        if len(self._pendientes) >= self.max_lote:
+            self._aplicar_lote()
+        elif self._temporizador is None:
+            self._temporizador = asyncio.get_running_loop().call_later(
+                self.espera_lote, self._aplicar_lote)
+
+    def _aplicar_lote(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._pendientes = self._pendientes, []
+        if not lote:
+            return
+        try:
+            fallas = self.lista.ajustar_stock_lote([(codigo, cantidad) for _, codigo, cantidad, _ in lote])
+            for id_, codigo, cantidad, futuro in lote:
+                # Sin fallas ya se aplicó todo; si hubo, no se aplicó nada y se hace uno por uno
+                ok = True if not fallas else self.lista.ajustar_stock(codigo, cantidad)
+                futuro.set_result({"id": id_, "resultado": ok})
+        except Exception as e:
+            # Esto corre en un call_later: si algo falla, nadie debe quedar esperando respuesta
+            for id_, _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_result({"id": id_, "error": str(e)})
+
+
+async def servir(lista, host, puerto):
+    servidor = await ServidorInventario(lista).iniciar(host, puerto)
+    print(f"Inventario escuchando en {host}:{puerto}", flush=True)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def catalogo_de_prueba(productos):
+    """Lista en memoria con `productos` productos sintéticos; solo para medir carga."""
+    lista = ListaEnlazada()
+    lista.insertar_lote((str(i), f"Producto {i}", "General", 1.0, 1_000)
+                        for i in range(productos))
+    return lista
+
+
+# ------------------- GENERADOR DE CARGA -------------------
+async def _cliente(host, puerto, peticiones, ventana, productos, latencias, semilla):
+    azar = random.Random(semilla)
+    reader, writer = await asyncio.open_connection(host, puerto, limit=2 ** 24)
+    enviadas = {}
+    libres = asyncio.Semaphore(ventana)   # Peticiones en vuelo a la vez por cliente
+
+    async def enviar():
+        for i in range(peticiones):
+            await libres.acquire()
+            codigo = str(azar.randrange(productos))
+            if azar.random() < 0.8:
+                peticion = {"id": i, "op": "ajustar_stock", "args": [codigo, azar.randint(-3, 3)]}
+            else:
+                peticion = {"id": i, "op": "buscar_nodo", "args": [codigo]}
+            enviadas[i] = time.perf_counter()
+            writer.write(json.dumps(peticion).encode() + b"\n")
+            await writer.drain()
+
+    async def recibir():
+        for _ in range(peticiones):
+            respuesta = json.loads(await reader.readline())
+            latencias.append(time.perf_counter() - enviadas.pop(respuesta["id"]))
+            libres.release()
+
+    await asyncio.gather(enviar(), recibir())
+    writer.close()
+    await writer.wait_closed()
+
+
+async def generar_carga(host, puerto, clientes, peticiones, ventana, productos):
+    """Lanza `clientes` conexiones a la vez y devuelve (peticiones/seg, p50 ms, p99 ms)."""
+    latencias = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(host, puerto, peticiones, ventana, productos, latencias, n)
+                           for n in range(clientes)))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    p50 = latencias[len(latencias) // 2] * 1000
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+    return len(latencias) / segundos, p50, p99
+
+
+# ------------------- EJECUCIÓN -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de inventario compartido")
+    parser.add_argument("modo", choices=["servir", "carga"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--motor", choices=sorted(MOTORES),
+                        help="motor de almacenamiento (o la variable INVENTARIO_MOTOR)")
+    parser.add_argument("--datos", default="inventario_datos", help="carpeta de datos")
+    parser.add_argument("--productos", type=int, default=10_000,
+                        help="en modo carga, productos del catálogo de prueba")
+    parser.add_argument("--prueba", action="store_true",
+                        help="en modo servir, usar un catálogo de prueba en memoria en vez "
+                             "de los datos guardados (es lo que hace el modo carga)")
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--peticiones", type=int, default=50, help="peticiones por cliente")
+    parser.add_argument("--ventana", type=int, default=4, help="peticiones en vuelo por cliente")
+    parser.add_argument("--sin-servidor", action="store_true",
+                        help="en modo carga, usar un servidor que ya está corriendo")
+    args = parser.parse_args()
+
+    if args.modo == "servir":
+        if args.prueba:
+            lista = catalogo_de_prueba(args.productos)
+        else:
+            lista = abrir_motor(args.motor, args.datos)
+        try:
+            asyncio.run(servir(lista, args.host, args.puerto))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Los motores con datos en disco escriben lo pendiente y sueltan sus archivos
+            if hasattr(lista, "cerrar"):
+                lista.cerrar()
+    else:
+        proceso = None
+        if not args.sin_servidor:
+            proceso = subprocess.Popen([sys.executable, __file__, "servir", "--host", args.host,
+                                        "--puerto", str(args.puerto),
+                                        "--prueba", "--productos", str(args.productos)],
+                                       stdout=subprocess.PIPE, text=True)
+            proceso.stdout.readline()   # Espera a que el servidor esté escuchando
+        try:
+            por_seg, p50, p99 = asyncio.run(generar_carga(args.host, args.puerto, args.clientes,
+                                                          args.peticiones, args.ventana,
+                                                          args.productos))
+            print(f"{args.clientes} clientes x {args.peticiones} peticiones: "
+                  f"{por_seg:,.0f} peticiones/seg | p50 {p50:.1f} ms | p99 {p99:.1f} ms")
+        finally:
+            if proceso:
+                proceso.terminate()